@@ -0,0 +1,5 @@
+from .frame_index import Frame, FrameIndex, FrameIndexBuilder, scene_odometry_table
+from .sequence_data import SequenceData, ColumnarRadarData
+from .sequence_cache import write_sequence_cache, load_sequence_cache, source_signature, \
+    sequence_cache_dir
+from .h5_sequence import H5SequenceData, H5SequenceReader
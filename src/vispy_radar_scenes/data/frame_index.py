@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""FrameIndex holds the row offsets of every radar frame of a sequence so that frames can be sliced in O(1)
+"""
+
+import numpy as np
+
+from dataclasses import dataclass
+
+
+@dataclass
+class Frame:
+    """
+    A single radar frame. Lightweight replacement for radar_scenes.scene.Scene holding only what the viewer needs.
+    """
+    timestamp: int
+    radar_data: np.ndarray
+    odometry_data: np.ndarray
+
+
+class FrameIndex:
+    """
+    Index over all frames of a sequence. A frame is a block of consecutive rows in the radar data array which share
+    the same timestamp. For each frame, the timestamp, the row range [start, end), the index of its odometry entry and
+    the id of the sensor which measured the frame are stored.
+    """
+
+    def __init__(self, timestamps: np.ndarray, starts: np.ndarray, ends: np.ndarray, odometry_indices: np.ndarray,
+                 sensor_ids: np.ndarray):
+        self.timestamps = timestamps
+        self.starts = starts
+        self.ends = ends
+        self.odometry_indices = odometry_indices
+        self.sensor_ids = sensor_ids
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @classmethod
+    def empty(cls) -> "FrameIndex":
+        """
+        :return: FrameIndex without any frames
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        return cls(np.zeros(0, dtype=np.uint64), empty, empty, empty, np.zeros(0, dtype=np.uint8))
+
+    @classmethod
+    def from_radar_data(cls, radar_timestamps: np.ndarray, radar_sensor_ids: np.ndarray,
+                        odometry_timestamps: np.ndarray, scene_odometry=None) -> "FrameIndex":
+        """
+        Builds the frame index in one vectorized pass over the timestamp column of the radar data.
+        :param radar_timestamps: Shape (n_detections,). The "timestamp" column of the radar data, ordered by time.
+        :param radar_sensor_ids: Shape (n_detections,). The "sensor_id" column of the radar data.
+        :param odometry_timestamps: Shape (n_odometry,). The "timestamp" column of the odometry data, ordered by time.
+        :param scene_odometry: Optional output of scene_odometry_table, see FrameIndexBuilder
+        :return: FrameIndex object
+        """
+        builder = FrameIndexBuilder(odometry_timestamps, scene_odometry)
+        frame_index = builder.add_chunk(radar_timestamps, radar_sensor_ids)
+        frame_index.extend(builder.finish())
+        return frame_index
+
+    def extend(self, other: "FrameIndex") -> None:
+        """
+        Appends the frames of another index, e.g. a batch which was produced by a FrameIndexBuilder.
+        :param other: FrameIndex whose frames all follow the frames of this index
+        :return: None
+        """
+        if len(other) == 0:
+            return
+        self.timestamps = np.concatenate((self.timestamps, other.timestamps))
+        self.starts = np.concatenate((self.starts, other.starts))
+        self.ends = np.concatenate((self.ends, other.ends))
+        self.odometry_indices = np.concatenate((self.odometry_indices, other.odometry_indices))
+        self.sensor_ids = np.concatenate((self.sensor_ids, other.sensor_ids))
+
+    def snapshot(self) -> "FrameIndex":
+        """
+        :return: FrameIndex of the frames indexed so far. It shares the arrays of this index, which extend replaces
+        instead of changing them, so the snapshot stays the same while this index grows, e.g. on another thread.
+        """
+        return FrameIndex(self.timestamps, self.starts, self.ends, self.odometry_indices, self.sensor_ids)
+
+    def row_range(self, frame_idx: int):
+        """
+        :param frame_idx: Index of the frame
+        :return: Tuple (start, end) of the rows of this frame within the radar data array
+        """
+        return int(self.starts[frame_idx]), int(self.ends[frame_idx])
+
+    def row_frames(self, first_frame: int = 0, end_frame: int = None) -> np.ndarray:
+        """
+        :param first_frame: Index of the first frame
+        :param end_frame: Index after the last frame, None for all frames
+        :return: Index of the frame of every row of the frames first_frame:end_frame. Frames are contiguous, so this
+        covers the rows starts[first_frame]:ends[end_frame - 1].
+        """
+        end_frame = len(self) if end_frame is None else end_frame
+        counts = np.asarray(self.ends[first_frame:end_frame]) - np.asarray(self.starts[first_frame:end_frame])
+        return np.repeat(np.arange(first_frame, end_frame), counts)
+
+    def sweep_window(self, frame_idx: int, max_lookback: int) -> np.ndarray:
+        """
+        Finds the most recent frame of every sensor up to and including frame_idx. Together, these frames form the
+        accumulated scene which is displayed for frame_idx.
+        :param frame_idx: Index of the current frame
+        :param max_lookback: Maximum number of frames to look back. Sensors without a frame in this range are dropped.
+        :return: Frame indices in ascending order. The last one is frame_idx.
+        """
+        first = max(0, frame_idx - max_lookback)
+        recent = self.sensor_ids[first:frame_idx + 1][::-1]
+        _, first_occurrence = np.unique(recent, return_index=True)
+        return np.sort(frame_idx - first_occurrence)
+
+    def get_frame(self, radar_data, odometry_data: np.ndarray, frame_idx: int) -> Frame:
+        """
+        Slices a single frame out of the radar and odometry data of a sequence.
+        :param radar_data: Radar data of the sequence. Anything that supports slicing of rows.
+        :param odometry_data: Odometry data of the sequence.
+        :param frame_idx: Index of the frame
+        :return: Frame object
+        """
+        start, end = self.row_range(frame_idx)
+        return Frame(timestamp=int(self.timestamps[frame_idx]),
+                     radar_data=radar_data[start:end],
+                     odometry_data=odometry_data[self.odometry_indices[frame_idx]])
+
+
+class FrameIndexBuilder:
+    """
+    Builds a frame index incrementally from consecutive blocks of the timestamp column of the radar data.
+    Every block returns the frames which were completed by it. The last frame of a block stays open until a row with a
+    different timestamp arrives or finish() is called.
+    The odometry entry of a frame is the "odometry_index" of its scene in scenes.json, if scene_odometry is given and
+    lists the frame. Otherwise, e.g. when a radar_data.h5 file is opened on its own, the odometry entry closest in
+    time is used.
+    """
+
+    def __init__(self, odometry_timestamps: np.ndarray, scene_odometry=None):
+        """
+        :param odometry_timestamps: Shape (n_odometry,). The "timestamp" column of the odometry data, ordered by time.
+        :param scene_odometry: Optional tuple (timestamps, odometry_indices) of the scenes of scenes.json, see
+        scene_odometry_table
+        """
+        self.odometry_timestamps = np.asarray(odometry_timestamps)
+        self.scene_odometry = scene_odometry
+        self.rows_seen = 0
+        self._open_start = 0
+        self._open_timestamp = None
+        self._open_sensor_id = None
+        self._last_timestamp = None
+
+    def add_chunk(self, radar_timestamps: np.ndarray, radar_sensor_ids: np.ndarray) -> FrameIndex:
+        """
+        :param radar_timestamps: The next block of the "timestamp" column of the radar data.
+        :param radar_sensor_ids: The same block of the "sensor_id" column of the radar data.
+        :return: FrameIndex with all frames which were completed by this block. May be empty.
+        """
+        radar_timestamps = np.asarray(radar_timestamps)
+        radar_sensor_ids = np.asarray(radar_sensor_ids)
+        if len(radar_timestamps) == 0:
+            return FrameIndex.empty()
+
+        offset = self.rows_seen
+        boundaries = np.flatnonzero(radar_timestamps[1:] != radar_timestamps[:-1]) + 1
+        if self._open_timestamp is not None and radar_timestamps[0] != self._open_timestamp:
+            boundaries = np.concatenate(([0], boundaries))
+        boundaries = boundaries.astype(np.int64) + offset
+
+        ends = boundaries
+        starts = np.concatenate(([self._open_start], boundaries[:-1]))[:len(ends)].astype(np.int64)
+        timestamps = radar_timestamps[np.maximum(starts - offset, 0)]
+        sensor_ids = radar_sensor_ids[np.maximum(starts - offset, 0)]
+        if len(starts) > 0 and starts[0] < offset:
+            # First completed frame started in a previous block
+            timestamps[0] = self._open_timestamp
+            sensor_ids[0] = self._open_sensor_id
+
+        if len(boundaries) > 0:
+            self._open_start = int(boundaries[-1])
+            self._open_sensor_id = radar_sensor_ids[self._open_start - offset]
+        elif self._open_timestamp is None:
+            self._open_sensor_id = radar_sensor_ids[0]
+        self._open_timestamp = radar_timestamps[-1]
+        self.rows_seen += len(radar_timestamps)
+        return self._make_index(timestamps, starts, ends, sensor_ids)
+
+    def finish(self) -> FrameIndex:
+        """
+        Closes the last frame. Must be called after the last block.
+        :return: FrameIndex containing the last frame, or an empty index if no rows were added.
+        """
+        if self.rows_seen == self._open_start:
+            return FrameIndex.empty()
+        timestamps = np.array([self._open_timestamp])
+        starts = np.array([self._open_start], dtype=np.int64)
+        ends = np.array([self.rows_seen], dtype=np.int64)
+        sensor_ids = np.array([self._open_sensor_id])
+        self._open_start = self.rows_seen
+        return self._make_index(timestamps, starts, ends, sensor_ids)
+
+    def _make_index(self, timestamps, starts, ends, sensor_ids) -> FrameIndex:
+        if len(timestamps) == 0:
+            return FrameIndex.empty()
+        ordered = timestamps if self._last_timestamp is None else \
+            np.concatenate(([self._last_timestamp], timestamps))
+        if np.any(ordered[1:] <= ordered[:-1]):
+            raise ValueError("Radar data is not ordered by timestamp.")
+        self._last_timestamp = timestamps[-1]
+        odometry_indices = nearest_indices(self.odometry_timestamps, timestamps)
+        if self.scene_odometry is not None and len(self.scene_odometry[0]) > 0:
+            scene_timestamps, scene_indices = self.scene_odometry
+            positions = np.minimum(np.searchsorted(scene_timestamps, timestamps), len(scene_timestamps) - 1)
+            listed = scene_timestamps[positions] == timestamps
+            odometry_indices[listed] = scene_indices[positions[listed]]
+        return FrameIndex(timestamps, starts, ends, odometry_indices, sensor_ids)
+
+
+def scene_odometry_table(scenes: dict):
+    """
+    Extracts the odometry index of every scene of a scenes.json file.
+    :param scenes: The "scenes" dictionary of scenes.json, keyed by timestamp
+    :return: Tuple (timestamps, odometry_indices) of two arrays of shape (n_scenes,), ordered by timestamp
+    """
+    timestamps = np.fromiter((int(timestamp) for timestamp in scenes), dtype=np.uint64, count=len(scenes))
+    odometry_indices = np.fromiter((scene["odometry_index"] for scene in scenes.values()), dtype=np.int64,
+                                   count=len(scenes))
+    order = np.argsort(timestamps, kind="stable")
+    return timestamps[order], odometry_indices[order]
+
+
+def nearest_indices(sorted_values: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """
+    For every query, finds the index of the closest value in a sorted array.
+    :param sorted_values: Shape (n,). Sorted values, n > 0.
+    :param queries: Shape (m,). Values for which the closest entry is sought.
+    :return: Shape (m,). Indices into sorted_values.
+    """
+    if len(sorted_values) == 1:
+        return np.zeros(len(queries), dtype=np.int64)
+    right = np.clip(np.searchsorted(sorted_values, queries), 1, len(sorted_values) - 1)
+    left = right - 1
+    # Compare in float64 to avoid wrap-around of unsigned timestamp differences
+    queries = queries.astype(np.float64)
+    take_left = (queries - sorted_values[left]) <= (sorted_values[right] - queries)
+    return np.where(take_left, left, right).astype(np.int64)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Reads a radar_data.h5 file of the RadarScenes dataset block by block
+"""
+
+import os
+
+import h5py
+import numpy as np
+
+from .frame_index import FrameIndex, FrameIndexBuilder
+from .sequence_data import SequenceData
+
+
+class H5SequenceData(SequenceData):
+    """
+    Sequence which keeps the radar data inside of the h5 file. radar_data is the h5py dataset itself, so slicing the
+    rows of a frame only reads the chunks which hold these rows.
+    """
+
+    def __init__(self, sequence_name: str, h5_file: h5py.File):
+        super().__init__(sequence_name, h5_file["radar_data"], h5_file["odometry"][:])
+        self.h5_file = h5_file
+
+    def close(self):
+        self.h5_file.close()
+
+
+class H5SequenceReader:
+    """
+    Opens a radar_data.h5 file and builds the frame index block by block. Iterating over the reader yields one
+    FrameIndex batch per block, so frames can be displayed before the whole file has been read.
+    In lazy mode, only the timestamp and sensor_id columns are read and the radar data stays in the file
+    (see H5SequenceData).
+    Otherwise, the radar data is copied into memory block by block. All frames of a yielded batch are fully loaded.
+    """
+
+    def __init__(self, filename: str, sequence_name: str = None, lazy: bool = True, chunk_rows: int = 1 << 18,
+                 chunk_cache_bytes: int = 16 * 1024 ** 2, scene_odometry=None):
+        """
+        :param filename: Full path to the radar_data.h5 file
+        :param sequence_name: Name of the sequence. Defaults to the name of the folder containing the file.
+        :param lazy: If True, the radar data is not loaded into memory.
+        :param chunk_rows: Number of rows which are read per block
+        :param chunk_cache_bytes: Size of the raw data chunk cache of the h5 file
+        :param scene_odometry: Odometry indices of the scenes of scenes.json, see FrameIndexBuilder. None uses the
+        odometry entry closest in time.
+        """
+        if sequence_name is None:
+            sequence_name = os.path.basename(os.path.dirname(os.path.abspath(filename)))
+        self.lazy = lazy
+        self.chunk_rows = chunk_rows
+        self.scene_odometry = scene_odometry
+        self.h5_file = h5py.File(filename, "r", rdcc_nbytes=chunk_cache_bytes)
+        self.dataset = self.h5_file["radar_data"]
+        if lazy:
+            self.sequence = H5SequenceData(sequence_name, self.h5_file)
+        else:
+            self.sequence = SequenceData(sequence_name, np.empty(len(self.dataset), dtype=self.dataset.dtype),
+                                         self.h5_file["odometry"][:])
+        self.frame_index = FrameIndex.empty()
+
+        self.rows_total = len(self.dataset)
+        self.rows_read = 0
+        # Lazy mode only reads the columns needed for the frame index
+        self.row_bytes = self.dataset.dtype["timestamp"].itemsize + self.dataset.dtype["sensor_id"].itemsize \
+            if lazy else self.dataset.dtype.itemsize
+        self.bytes_total = self.rows_total * self.row_bytes
+
+    @property
+    def bytes_read(self) -> int:
+        return self.rows_read * self.row_bytes
+
+    def __iter__(self):
+        builder = FrameIndexBuilder(self.sequence.odometry_data["timestamp"], self.scene_odometry)
+        radar_data = self.sequence.radar_data
+        for start in range(0, len(self.dataset), self.chunk_rows):
+            stop = min(start + self.chunk_rows, len(self.dataset))
+            if self.lazy:
+                block = self.dataset.fields(["timestamp", "sensor_id"])[start:stop]
+            else:
+                self.dataset.read_direct(radar_data, np.s_[start:stop], np.s_[start:stop])
+                block = radar_data[start:stop]
+            self.rows_read = stop
+            batch = builder.add_chunk(block["timestamp"], block["sensor_id"])
+            self.frame_index.extend(batch)
+            if len(batch) > 0:
+                yield batch
+        batch = builder.finish()
+        self.frame_index.extend(batch)
+        if len(batch) > 0:
+            yield batch
+
+    def close(self):
+        """
+        Closes the file, unless it is still needed by a lazy sequence.
+        :return: None
+        """
+        if not self.lazy:
+            self.h5_file.close()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Binary columnar cache of a sequence. Written on first load, memory mapped on every following load.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+
+from .frame_index import FrameIndex
+from .sequence_data import SequenceData, ColumnarRadarData
+
+
+CACHE_VERSION = 3
+
+_META_FILE = "meta.json"
+_ODOMETRY_FILE = "odometry.npy"
+_FRAME_INDEX_FILES = {
+    "timestamps": "frame_timestamps.npy",
+    "starts": "frame_starts.npy",
+    "ends": "frame_ends.npy",
+    "odometry_indices": "frame_odometry_indices.npy",
+    "sensor_ids": "frame_sensor_ids.npy",
+}
+
+
+def _column_file(field_name: str) -> str:
+    return f"radar_data.{field_name}.npy"
+
+
+def sequence_cache_dir(cache_root: str, source_file: str) -> str:
+    """
+    :param cache_root: Folder which holds the caches of all sequences. A relative folder is placed next to the
+    sequence.
+    :param source_file: The radar_data.h5 file of a sequence
+    :return: Cache folder of the sequence. It is named after the sequence folder and a hash of the full path of
+    source_file, so that sequences with the same folder name in different datasets do not share a cache. Outdated
+    contents are detected with source_signature.
+    """
+    source_file = os.path.realpath(source_file)
+    sequence_folder = os.path.dirname(source_file)
+    key = hashlib.sha1(source_file.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(sequence_folder, os.path.expanduser(cache_root), f"{os.path.basename(sequence_folder)}_{key}")
+
+
+def source_signature(source_file: str) -> dict:
+    """
+    :param source_file: The radar_data.h5 file of a sequence
+    :return: Size and modification time of the file and of the scenes.json file next to it. The scenes.json entries
+    are None if there is no such file.
+    """
+    stat = os.stat(source_file)
+    signature = {"source_size": stat.st_size, "source_mtime": stat.st_mtime, "scenes_size": None,
+                 "scenes_mtime": None}
+    scenes_file = os.path.join(os.path.dirname(source_file), "scenes.json")
+    if os.path.exists(scenes_file):
+        stat = os.stat(scenes_file)
+        signature.update({"scenes_size": stat.st_size, "scenes_mtime": stat.st_mtime})
+    return signature
+
+
+def write_sequence_cache(cache_dir: str, source_file: str, sequence, frame_index: FrameIndex) -> None:
+    """
+    Writes the radar data of a sequence as one .npy file per field, together with the odometry data and the frame
+    index. The cache is first written to a temporary folder which is renamed at the end, so that an interrupted
+    write never leaves a half written cache behind.
+    :param cache_dir: Folder of the cache. Is replaced if it exists.
+    :param source_file: The radar_data.h5 file the sequence was loaded from. Together with the scenes.json file next to
+    it, used to detect outdated caches.
+    :param sequence: Sequence object with the fields sequence_name, radar_data and odometry_data.
+    :param frame_index: Frame index of the sequence.
+    :return: None
+    """
+    tmp_dir = cache_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    radar_data = sequence.radar_data
+    for name in radar_data.dtype.names:
+        column = radar_data[name]
+        # Plain dtype drops h5py specific metadata (e.g. string encodings) which .npy files cannot store
+        column = column.astype(np.dtype(column.dtype.str))
+        np.save(os.path.join(tmp_dir, _column_file(name)), column)
+    np.save(os.path.join(tmp_dir, _ODOMETRY_FILE), np.ascontiguousarray(sequence.odometry_data))
+    for attr, file in _FRAME_INDEX_FILES.items():
+        np.save(os.path.join(tmp_dir, file), getattr(frame_index, attr))
+
+    meta = {
+        "version": CACHE_VERSION,
+        "sequence_name": sequence.sequence_name,
+        "fields": list(radar_data.dtype.names),
+    }
+    meta.update(source_signature(source_file))
+    with open(os.path.join(tmp_dir, _META_FILE), "w") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def load_sequence_cache(cache_dir: str, source_file: str):
+    """
+    Opens a cache written by write_sequence_cache. All arrays are memory mapped read-only, so opening is cheap and
+    only the pages which are actually accessed are read from disk.
+    :param cache_dir: Folder of the cache.
+    :param source_file: The radar_data.h5 file the cache was created from.
+    :return: Tuple (SequenceData, FrameIndex) or None, if there is no cache or it is outdated.
+    """
+    meta_file = os.path.join(cache_dir, _META_FILE)
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file, "r") as f:
+        meta = json.load(f)
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    if os.path.exists(source_file) and \
+            any(meta.get(key) != value for key, value in source_signature(source_file).items()):
+        return None
+
+    columns = {name: np.load(os.path.join(cache_dir, _column_file(name)), mmap_mode='r')
+               for name in meta["fields"]}
+    dtype = np.dtype([(name, columns[name].dtype, columns[name].shape[1:]) for name in meta["fields"]])
+    odometry_data = np.load(os.path.join(cache_dir, _ODOMETRY_FILE), mmap_mode='r')
+    frame_index = FrameIndex(**{attr: np.load(os.path.join(cache_dir, file), mmap_mode='r')
+                                for attr, file in _FRAME_INDEX_FILES.items()})
+
+    sequence = SequenceData(meta["sequence_name"], ColumnarRadarData(columns, dtype), odometry_data)
+    return sequence, frame_index
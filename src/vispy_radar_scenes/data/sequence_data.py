@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Containers for the radar and odometry data of a sequence which do not depend on radar_scenes.sequence.Sequence
+"""
+
+import numpy as np
+
+from typing import Dict
+
+
+class SequenceData:
+    """
+    Minimal sequence container. Exposes the same attributes of a radar_scenes Sequence that the viewer uses, so both
+    can be used interchangeably.
+    """
+
+    def __init__(self, sequence_name: str, radar_data, odometry_data: np.ndarray):
+        self.sequence_name = sequence_name
+        self.radar_data = radar_data
+        self.odometry_data = odometry_data
+
+    def close(self):
+        """Releases any file handles held by the data. Nothing to do for in-memory data."""
+        pass
+
+
+class ColumnarRadarData:
+    """
+    Radar data stored as one contiguous array per field (struct of arrays), e.g. memory mapped .npy files.
+    Indexing with a field name returns the column. Indexing with a slice or an index array assembles a regular
+    structured array for these rows only, so that frame slices behave like slices of the original radar data.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], dtype: np.dtype):
+        self.columns = columns
+        self.dtype = dtype
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            return self.columns[item]
+        first_column = self.columns[self.dtype.names[0]][item]
+        rows = np.empty(len(first_column), dtype=self.dtype)
+        for name in self.dtype.names:
+            rows[name] = self.columns[name][item]
+        return rows
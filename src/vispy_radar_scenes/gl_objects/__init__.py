@@ -2,4 +2,5 @@ from .gl_object_buffer import GLObjectBuffer
 from .gl_radar_detections import GLRadarDetections
 from .gl_radar_doppler_lines import GLRadarDopplerLines
 from .gl_circle import GLCircle
+from .gl_colormap import GLColormap
 from .gl_polar_grid import GLPolarGrid
\ No newline at end of file
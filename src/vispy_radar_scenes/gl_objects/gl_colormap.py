@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""GL_Colormap holds the colormaps of all coloring options in one texture which is sampled in the shaders
+"""
+
+import numpy as np
+
+from vispy import gloo
+
+from ..utils import ColorOpts, Colors
+
+
+class GLColormap:
+    """
+    Colormaps of all ColorOpts in one texture with one row per option. The shaders map the raw attribute selected by
+    u_color_channel from u_color_range onto the row, so switching the coloring only changes uniforms.
+    """
+    width: int = 256
+
+    # Channel of (a_doppler, a_rcs, a_sensor_id) and the value range for every coloring option
+    channels = {
+        ColorOpts.DOPPLER: (0, (-10.0, 10.0)),
+        ColorOpts.RCS: (1, (-20.0, 20.0)),
+        ColorOpts.SENSORID: (2, (0.0, width - 1.0)),
+    }
+
+    def __init__(self):
+        self.options = list(ColorOpts)
+        t = np.linspace(0, 1, self.width)
+        data = np.zeros((len(self.options), self.width, 4), np.float32)
+        for row, option in enumerate(self.options):
+            if option == ColorOpts.DOPPLER:
+                base_color_positive = Colors.hex_to_rgba(Colors.red)
+                base_color_negative = Colors.hex_to_rgba(Colors.blue)
+                Colors.color_gradient_array(base_color_negative, base_color_positive, t, out=data[row])
+            elif option == ColorOpts.RCS:
+                base_color = Colors.hex_to_rgba(Colors.green)
+                Colors.color_gradient_array((0, 0, 0, 0), base_color, t, out=data[row])
+            elif option == ColorOpts.SENSORID:
+                Colors.sensor_id_colors(np.arange(self.width), out=data[row])
+        self.texture = gloo.Texture2D(data, interpolation='linear', wrapping='clamp_to_edge')
+
+    def apply(self, program: gloo.Program, color_by: str = None):
+        """
+        Sets the colormap uniforms of a program.
+        :param program: Program using the colormap uniforms of detection_vertex.glsl
+        :param color_by: Value of a ColorOpts entry. None disables the colormap, the colors of the vertices are used.
+        :return: None
+        """
+        option = next((x for x in self.options if x.value == color_by), None)
+        program['u_colormap'] = self.texture
+        program['u_colormap_width'] = float(self.width)
+        if option is None or option not in self.channels:
+            program['u_use_colormap'] = 0.0
+            program['u_color_channel'] = (0.0, 0.0, 0.0)
+            program['u_color_range'] = (0.0, 1.0)
+            program['u_colormap_row'] = 0.0
+            return
+        channel, value_range = self.channels[option]
+        program['u_use_colormap'] = 1.0
+        program['u_color_channel'] = tuple(float(i == channel) for i in range(3))
+        program['u_color_range'] = value_range
+        program['u_colormap_row'] = (self.options.index(option) + 0.5) / len(self.options)
@@ -12,10 +12,28 @@ from ..utils import load_shader
 
 
 class GLObjectBuffer(ABC):
+    # Factor by which the capacity grows when more rows are reserved than fit into the buffer
+    growth_factor: float = 2.0
+    # The capacity shrinks after this many consecutive reserve() calls using less than a quarter of it. 0 never shrinks.
+    shrink_after: int = 0
+
     @abstractmethod
     def __init__(self, buffer_size: int):
         self.buffer_size = buffer_size
+        self.initial_buffer_size = buffer_size
         self._program = None
+        # List of (first, count) vertex ranges to draw. None draws the whole buffer.
+        self.draw_ranges = None
+        # Number of live vertices at the beginning of the buffer. Vertices behind them are never drawn.
+        self.live_count = buffer_size
+        # Range (start, stop) of rows which changed since the last upload. None uploads the whole buffer.
+        self._dirty = None
+        self.uploaded_bytes = 0
+        self.capacity_changes = 0
+        self._low_use_count = 0
+        # Index buffer of the vertices in _index_ranges, rebuilt when the visible ranges change
+        self._index_buffer = None
+        self._index_ranges = None
 
     def load_program(self, vert_file, frag_file, geom_file=None):
         vertex_shader = load_shader(vert_file)
@@ -28,7 +46,107 @@ class GLObjectBuffer(ABC):
         self._program.bind(self.vbo)
 
     def update(self):
-        self.vbo.set_data(self.data)
+        """
+        Uploads the rows marked with mark_dirty(), or the whole vertex array if no rows were marked.
+        :return: None
+        """
+        if self._dirty is None:
+            self.vbo.set_data(self.data)
+            self.uploaded_bytes = self.data.nbytes
+        else:
+            start, stop = self._dirty
+            self.vbo.set_subdata(self.data[start:stop], offset=start)
+            self.uploaded_bytes = self.data[start:stop].nbytes
+        self._dirty = None
+
+    def mark_dirty(self, start: int, stop: int):
+        """
+        Marks the rows start:stop of data as changed, they are uploaded with the next update().
+        Several ranges are merged into one range covering all of them.
+        :param start: First changed row
+        :param stop: Row after the last changed row
+        :return: None
+        """
+        if self._dirty is not None:
+            start, stop = min(start, self._dirty[0]), max(stop, self._dirty[1])
+        self._dirty = (start, stop)
+
+    def set_data(self, data: np.ndarray):
+        """
+        Replaces the vertex array and uploads it. The buffer is resized if the length differs.
+        :param data: Vertex array with the dtype of data
+        :return: None
+        """
+        resized = len(data) != self.buffer_size
+        self._data = data
+        self.buffer_size = len(data)
+        self.live_count = len(data)
+        self._dirty = None
+        self.update()
+        if resized:
+            self.capacity_changes += 1
+            self._program.bind(self.vbo)
+
+    def reserve(self, count: int):
+        """
+        Makes sure that data can hold count rows. The capacity grows geometrically, so a sequence of growing frames
+        only causes a logarithmic number of reallocations. If shrink_after is set, the capacity shrinks again after
+        sustained low use, but never below the initial buffer size.
+        :param count: Number of rows which are written next
+        :return: None
+        """
+        if count > self.buffer_size:
+            self._low_use_count = 0
+            self._reallocate(max(count, int(np.ceil(self.buffer_size * self.growth_factor))))
+        elif self.shrink_after > 0 and self.buffer_size > self.initial_buffer_size and 4 * count < self.buffer_size:
+            self._low_use_count += 1
+            if self._low_use_count >= self.shrink_after:
+                self._low_use_count = 0
+                self._reallocate(max(self.initial_buffer_size, 2 * count))
+        else:
+            self._low_use_count = 0
+
+    def _reallocate(self, capacity: int):
+        """
+        Replaces data by an array of the given capacity which keeps the live rows, resizes the vertex buffer and binds
+        it to the program again. The live rows have to be uploaded again, they are marked as dirty.
+        """
+        self.live_count = min(self.live_count, capacity)
+        data = np.zeros(capacity, self.data.dtype)
+        data[:self.live_count] = self.data[:self.live_count]
+        self._data = data
+        self.buffer_size = capacity
+        self.vbo.resize_bytes(data.nbytes)
+        self._program.bind(self.vbo)
+        self._dirty = None
+        self.mark_dirty(0, self.live_count)
+        self.capacity_changes += 1
+
+    def draw(self):
+        """
+        Draws the vertex ranges returned by visible_ranges(). Nothing is submitted if there are none.
+        The ranges are drawn with one indexed draw call. The index buffer is only uploaded again when they change.
+        :return: None
+        """
+        ranges = self.visible_ranges()
+        if not ranges:
+            return
+        if ranges != self._index_ranges:
+            indices = np.concatenate([np.arange(first, first + count, dtype=np.uint32) for first, count in ranges])
+            if self._index_buffer is None:
+                self._index_buffer = gloo.IndexBuffer(indices)
+            else:
+                self._index_buffer.set_data(indices)
+            self._index_ranges = ranges
+        self.program.draw(self.type, self._index_buffer)
+
+    def visible_ranges(self):
+        """
+        :return: List of non-empty (first, count) vertex ranges to draw: draw_ranges if set, otherwise the live
+        vertices
+        """
+        ranges = self.draw_ranges if self.draw_ranges is not None else [(0, self.live_count)]
+        return [(first, count) for first, count in ranges if count > 0]
 
     @property
     def program(self):
@@ -92,6 +210,19 @@ class GLObjectBuffer(ABC):
         self._scale = value
         self.program['u_scale'] = self._scale
 
+    @property
+    def seq_to_car(self):
+        """3x3 transformation matrix from sequence to car coordinates which is applied in the vertex shader"""
+        if not hasattr(self, '_seq_to_car'):
+            self.seq_to_car = np.eye(3, dtype=np.float32)
+        return self._seq_to_car
+
+    @seq_to_car.setter
+    def seq_to_car(self, value):
+        self._seq_to_car = value
+        # numpy is row major, GLSL expects column major matrices
+        self.program['u_seq_to_car'] = np.asarray(value, dtype=np.float32).T
+
     @property
     @abstractmethod
     def type(self) -> str:
@@ -15,8 +15,18 @@ class GLRadarDetections(GLObjectBuffer):
     u_linewidth: float = 0.1
     u_antialias: float = 1.0
 
+    vertex_dtype = np.dtype([('a_position', np.float32, 3),
+                             ('a_bg_color', np.float32, 4),
+                             ('a_fg_color', np.float32, 4),
+                             ('a_size', np.float32),
+                             ('a_doppler', np.float32),
+                             ('a_rcs', np.float32),
+                             ('a_sensor_id', np.float32)])
+
     def __init__(self, buffer_size: int = 50000):
         super().__init__(buffer_size)
+        # Empty until the first frame is uploaded
+        self.live_count = 0
 
         self.load_program(self.vertex_shader_file,
                           self.fragment_shader_file)
@@ -31,9 +41,5 @@ class GLRadarDetections(GLObjectBuffer):
     @property
     def data(self):
         if not hasattr(self, '_data'):
-            self._data = \
-                np.zeros(self.buffer_size, [('a_position', np.float32, 3),
-                                            ('a_bg_color', np.float32, 4),
-                                            ('a_fg_color', np.float32, 4),
-                                            ('a_size', np.float32)])
+            self._data = np.zeros(self.buffer_size, self.vertex_dtype)
         return self._data
\ No newline at end of file
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-"""GL_RadarDetections inherits GL_ObjectBuffer and provides a way to visualize detections
+"""GL_RadarDopplerLines inherits GL_ObjectBuffer and draws the Doppler velocity of detections as arrows. The arrows
+are expanded from per detection attributes in the vertex shader.
 """
 
 import numpy as np
@@ -9,15 +10,29 @@ from .gl_object_buffer import GLObjectBuffer
 
 
 class GLRadarDopplerLines(GLObjectBuffer):
-    vertex_shader_file: str = 'line_vertex.glsl'
-    fragment_shader_file: str = 'line_fragment.glsl'
+    vertex_shader_file: str = 'doppler_line_vertex.glsl'
+    fragment_shader_file: str = 'doppler_line_fragment.glsl'
     #geometry_shader_file: str = 'line_geometry.glsl'
 
     u_linewidth: float = 2.0
     #u_antialias: float = 1.0
 
+    vertex_dtype = np.dtype([('a_position', np.float32, 3),
+                             ('a_color', np.float32, 4),
+                             ('a_doppler', np.float32),
+                             ('a_rcs', np.float32),
+                             ('a_sensor_id', np.float32),
+                             ('a_angle', np.float32),
+                             ('a_offset', np.float32, 2)])
+
+    # Vertices of one arrow as offsets along and across the arrow, in units of the arrow length
+    shaft_offsets = np.array([(0, 0), (1, 0)], np.float32)
+    head_offsets = np.array([(1, 0), (0.75, 0.1), (1, 0), (0.75, -0.1)], np.float32)
+
     def __init__(self, buffer_size: int = 50000):
         super().__init__(buffer_size)
+        # Empty until the first frame is uploaded
+        self.live_count = 0
 
         self.load_program(self.vertex_shader_file,
                           self.fragment_shader_file)
@@ -25,6 +40,28 @@ class GLRadarDopplerLines(GLObjectBuffer):
         self.program['u_linewidth'] = self.u_linewidth
         #self.program['u_antialias'] = self.u_antialias
 
+    @classmethod
+    def arrow_offsets(cls, arrowheads: bool) -> np.ndarray:
+        """
+        :param arrowheads: Whether the arrows have heads
+        :return: Array with shape (vertices_per_arrow, 2), the values of a_offset of the vertices of one arrow
+        """
+        if arrowheads:
+            return np.concatenate([cls.shaft_offsets, cls.head_offsets])
+        return cls.shaft_offsets
+
+    @property
+    def doppler_scale(self):
+        """Arrow length per m/s of Doppler velocity"""
+        if not hasattr(self, '_doppler_scale'):
+            self.doppler_scale = 1.0
+        return self._doppler_scale
+
+    @doppler_scale.setter
+    def doppler_scale(self, value):
+        self._doppler_scale = value
+        self.program['u_doppler_scale'] = float(self._doppler_scale)
+
     @property
     def type(self):
         return 'lines'
@@ -32,7 +69,5 @@ class GLRadarDopplerLines(GLObjectBuffer):
     @property
     def data(self):
         if not hasattr(self, '_data'):
-            self._data = \
-                np.zeros(self.buffer_size, [('a_position', np.float32, 3),
-                                            ('a_color', np.float32, 4)])
+            self._data = np.zeros(self.buffer_size, self.vertex_dtype)
         return self._data
\ No newline at end of file
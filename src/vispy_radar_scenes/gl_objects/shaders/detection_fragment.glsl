@@ -4,6 +4,11 @@
 // ------------------------------------
 
 
+// Uniforms
+// ------------------------------------
+uniform sampler2D u_colormap;
+uniform float u_use_colormap;  // 1 to look the fill color up in the colormap, 0 to use a_bg_color
+
 // Varyings
 // ------------------------------------
 varying vec4 v_fg_color;
@@ -11,6 +16,7 @@ varying vec4 v_bg_color;
 varying float v_size;
 varying float v_linewidth;
 varying float v_antialias;
+varying vec2 v_colormap_coord;
 
 // Functions
 // ------------------------------------
@@ -122,6 +128,10 @@ float cross(vec2 P, float size)
 // ------------------------------------
 void main()
 {
+    vec4 bg_color = v_bg_color;
+    if (u_use_colormap > 0.5)
+        bg_color = texture2D(u_colormap, v_colormap_coord);
+
     float size = v_size +2.0*(v_linewidth + 1.5*v_antialias);
     float t = v_linewidth/2.0-v_antialias;
 
@@ -152,6 +162,6 @@ void main()
         if (r > 0.)
             gl_FragColor = vec4(v_fg_color.rgb, alpha*v_fg_color.a);
         else
-            gl_FragColor = mix(v_bg_color, v_fg_color, alpha);
+            gl_FragColor = mix(bg_color, v_fg_color, alpha);
     }
 }
\ No newline at end of file
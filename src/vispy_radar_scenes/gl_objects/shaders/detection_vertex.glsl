@@ -8,6 +8,11 @@ uniform mat4 u_projection;
 uniform float u_linewidth;
 uniform float u_antialias;
 uniform float u_scale;
+uniform mat3 u_seq_to_car;  // Rigid transform from sequence to car coordinates
+uniform vec3 u_color_channel;  // Selects the attribute which is colored: (Doppler, RCS, sensor id)
+uniform vec2 u_color_range;  // Attribute values which are mapped to the first and the last texel of the colormap
+uniform float u_colormap_row;  // Texture coordinate of the colormap row
+uniform float u_colormap_width;  // Number of texels of one colormap
 
 // Attributes
 // ------------------------------------
@@ -15,6 +20,9 @@ attribute vec3  a_position;
 attribute vec4  a_fg_color;
 attribute vec4  a_bg_color;
 attribute float a_size;
+attribute float a_doppler;
+attribute float a_rcs;
+attribute float a_sensor_id;
 
 // Varyings
 // ------------------------------------
@@ -23,6 +31,7 @@ varying vec4 v_bg_color;
 varying float v_size;
 varying float v_linewidth;
 varying float v_antialias;
+varying vec2 v_colormap_coord;
 
 void main (void) {
     v_size = a_size * u_scale;
@@ -30,6 +39,10 @@ void main (void) {
     v_antialias = u_antialias;
     v_fg_color  = a_fg_color;
     v_bg_color  = a_bg_color;
-    gl_Position = u_projection * u_view * u_model * vec4(a_position,1.0);
+    float value = dot(vec3(a_doppler, a_rcs, a_sensor_id), u_color_channel);
+    float t = clamp((value - u_color_range.x) / (u_color_range.y - u_color_range.x), 0.0, 1.0);
+    v_colormap_coord = vec2((0.5 + t * (u_colormap_width - 1.0)) / u_colormap_width, u_colormap_row);
+    vec3 car_position = u_seq_to_car * vec3(a_position.xy, 1.0);
+    gl_Position = u_projection * u_view * u_model * vec4(car_position.xy, a_position.z, 1.0);
     gl_PointSize = v_size + 2.*(v_linewidth + 1.5*v_antialias);
 }
\ No newline at end of file
@@ -0,0 +1,20 @@
+#version 120
+
+// Uniforms
+// ------------------------------------
+uniform sampler2D u_colormap;
+uniform float u_use_colormap;  // 1 to look the color up in the colormap, 0 to use a_color
+
+// Varyings
+// ------------------------------------
+varying vec4 v_color;
+varying vec2 v_colormap_coord;
+
+// Main
+// ------------------------------------
+void main() {
+    if (u_use_colormap > 0.5)
+        gl_FragColor = texture2D(u_colormap, v_colormap_coord);
+    else
+        gl_FragColor = v_color;
+}
\ No newline at end of file
@@ -0,0 +1,46 @@
+#version 120
+
+// Uniforms
+// ------------------------------------
+uniform float u_linewidth;
+uniform mat4 u_view;
+uniform mat4 u_model;
+uniform mat4 u_projection;
+uniform float u_scale;
+uniform mat3 u_seq_to_car;  // Rigid transform from sequence to car coordinates
+uniform vec3 u_color_channel;  // Selects the attribute which is colored: (Doppler, RCS, sensor id)
+uniform vec2 u_color_range;  // Attribute values which are mapped to the first and the last texel of the colormap
+uniform float u_colormap_row;  // Texture coordinate of the colormap row
+uniform float u_colormap_width;  // Number of texels of one colormap
+uniform float u_doppler_scale;  // Arrow length per m/s of Doppler velocity
+
+// Attributes
+// ------------------------------------
+attribute vec3 a_position;
+attribute vec4 a_color;
+attribute float a_doppler;
+attribute float a_rcs;
+attribute float a_sensor_id;
+attribute float a_angle;  // Direction of the detection as seen from the sensor, in sequence coordinates
+attribute vec2 a_offset;  // Offset of the vertex along and across the arrow, in units of the arrow length
+
+// Varyings
+// ------------------------------------
+varying vec4 v_color;
+varying vec2 v_colormap_coord;
+
+// Main
+// ------------------------------------
+void main() {
+    v_color  = a_color;
+    float value = dot(vec3(a_doppler, a_rcs, a_sensor_id), u_color_channel);
+    float t = clamp((value - u_color_range.x) / (u_color_range.y - u_color_range.x), 0.0, 1.0);
+    v_colormap_coord = vec2((0.5 + t * (u_colormap_width - 1.0)) / u_colormap_width, u_colormap_row);
+    float arrow_length = u_doppler_scale * a_doppler;
+    vec2 direction = vec2(cos(a_angle), sin(a_angle));
+    vec2 normal = vec2(-direction.y, direction.x);
+    vec2 position = a_position.xy + arrow_length * (a_offset.x * direction + a_offset.y * normal);
+    vec3 car_position = u_seq_to_car * vec3(position, 1.0);
+    vec4 pos = u_view * u_model * vec4(car_position.xy, a_position.z, 1);
+    gl_Position = u_projection * pos;
+}
\ No newline at end of file
@@ -7,6 +7,7 @@ uniform mat4 u_view;
 uniform mat4 u_model;
 uniform mat4 u_projection;
 uniform float u_scale;
+uniform mat3 u_seq_to_car;  // Rigid transform from sequence to car coordinates
 
 // Attributes
 // ------------------------------------
@@ -21,6 +22,7 @@ varying vec4 v_color;
 // ------------------------------------
 void main() {
     v_color  = a_color;
-    vec4 pos = u_view * u_model * vec4(a_position, 1);
+    vec3 car_position = u_seq_to_car * vec3(a_position.xy, 1.0);
+    vec4 pos = u_view * u_model * vec4(car_position.xy, a_position.z, 1);
     gl_Position = u_projection * pos;
 }
\ No newline at end of file
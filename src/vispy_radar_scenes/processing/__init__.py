@@ -0,0 +1,13 @@
+from .frame_builder import build_frame, build_frame_from_columns
+from .sweep_accumulator import SweepAccumulator
+from .frame_prefetcher import FramePrefetcher
+from .frame_cache import FrameCache
+from .frame_source import FrameSource
+from .frame_geometry_builder import FrameGeometryBuilder
+from .vertex_builder import FrameVertices, build_vertices, build_geometry, apply_colors, build_arrows
+from .frame_pipeline import FramePipeline, Stage
+from .vertex_handoff import VertexHandoff, HandoffSlot
+from .sequence_vertices import SequenceVertices, sequence_radar_columns, build_sequence_vertices
+from .sequence_preprocessor import preprocess_sequence, load_preprocessed
+from .shared_vertex_arena import SharedVertexArena, ArenaSpec
+from .process_frame_prefetcher import ProcessFramePrefetcher
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Builds the accumulated radar scene of a frame in sequence coordinates
+"""
+
+import threading
+import numpy as np
+
+from typing import Dict
+
+from ..data import FrameIndex
+from .sweep_accumulator import SweepAccumulator
+
+
+_thread_state = threading.local()
+
+
+def build_frame(sequence, frame_index: FrameIndex, frame_idx: int, max_lookback: int,
+                accumulator: SweepAccumulator = None) -> Dict[str, np.ndarray]:
+    """
+    Accumulates the most recent sweep of every sensor up to frame_idx in sequence coordinates. The result only depends
+    on frame_idx, so frames can be built in any order and on any thread. Every thread reuses its own SweepAccumulator,
+    the result is a copy which stays valid. The sweeps are ordered by frame index, so the row order does not depend on
+    the frames which were built before.
+    :param sequence: Sequence with the fields radar_data and odometry_data
+    :param frame_index: Frame index of the sequence
+    :param frame_idx: Index of the current frame
+    :param max_lookback: Maximum number of frames to look back for sweeps of the other sensors
+    :param accumulator: SweepAccumulator to use instead of the one of the current thread
+    :return: Dictionary mapping every field of the radar data to an array with the data of all accumulated sweeps.
+    The fields "x_cc", "y_cc", "x_seq", "y_seq" and "azimuth_seq" are computed from range, azimuth, sensor mounting and
+    odometry. "x_cc" and "y_cc" are relative to the car position of the sweep of each detection.
+    """
+    if accumulator is None:
+        accumulator = getattr(_thread_state, "accumulator", None)
+    if accumulator is None:
+        accumulator = _thread_state.accumulator = SweepAccumulator()
+    radar_data = accumulator.update(sequence, frame_index, frame_idx, max_lookback)
+    sweep_slices = accumulator.sweep_slices()
+    return {name: np.concatenate([column[s] for s in sweep_slices]) if sweep_slices else column.copy()
+            for name, column in radar_data.items()}
+
+
+def build_frame_from_columns(columns: Dict[str, np.ndarray], frame_index: FrameIndex, frame_idx: int,
+                             max_lookback: int) -> Dict[str, np.ndarray]:
+    """
+    Same as build_frame, but slices the sweeps out of columns which were already converted to sequence coordinates,
+    see preprocess_sequence and sequence_radar_columns. Nothing is computed, the sweeps are only copied.
+    :param columns: Dictionary of columns of all indexed rows of the sequence
+    :param frame_index: Frame index of the sequence
+    :param frame_idx: Index of the current frame
+    :param max_lookback: Maximum number of frames to look back for sweeps of the other sensors
+    :return: Dictionary mapping every column to an array with the data of all accumulated sweeps
+    """
+    sweep_slices = [slice(*frame_index.row_range(sweep_idx))
+                    for sweep_idx in frame_index.sweep_window(frame_idx, max_lookback)]
+    return {name: np.concatenate([column[s] for s in sweep_slices]) for name, column in columns.items()}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Least recently used cache of processed frames with a memory budget
+"""
+
+from collections import OrderedDict
+
+
+class FrameCache:
+    """
+    LRU cache whose size is limited by the total number of bytes of its values. Values must provide an nbytes
+    attribute. The least recently used entries are evicted until the new entry fits into the budget.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        :param key: Key of the entry
+        :return: The cached value or None
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Inserts a value and evicts least recently used entries until the budget is met.
+        Values which are larger than the whole budget are not cached.
+        :param key: Key of the entry
+        :param value: Value with an nbytes attribute
+        :return: None
+        """
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key).nbytes
+        if value.nbytes > self.max_bytes:
+            return
+        while self._entries and self.nbytes + value.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        self._entries[key] = value
+        self.nbytes += value.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Builds the geometry of frames with a frame cache and prefetching of the neighbouring frames
+"""
+
+from .frame_cache import FrameCache
+from .frame_prefetcher import FramePrefetcher
+from .frame_source import FrameSource
+from .sweep_accumulator import SweepAccumulator
+from .vertex_builder import FrameVertices, build_geometry
+
+
+class FrameGeometryBuilder:
+    """
+    Returns the output of the geometry stage of frames of a FrameSource. Frames are looked up in the frame cache first,
+    then in the prefetcher. Frames which were not prefetched are built with an own SweepAccumulator. A new sequence or
+    new columns clear the cache.
+    Owns the cache, the prefetcher and the accumulator, so it must only be used from one thread: the processing thread
+    if it is enabled, the GUI thread otherwise.
+    """
+
+    def __init__(self, cache_bytes: int, prefetch_workers: int, prefetch_frames: int):
+        """
+        :param cache_bytes: Memory budget of the frame cache
+        :param prefetch_workers: Number of threads which prefetch frames
+        :param prefetch_frames: Number of frames before and after the current one which are prefetched
+        """
+        self.frame_cache = FrameCache(cache_bytes)
+        self.frame_prefetcher = FramePrefetcher(prefetch_workers)
+        self.sweep_accumulator = SweepAccumulator()
+        self.prefetch_frames = prefetch_frames
+        self._source = None
+
+    def geometry(self, source: FrameSource, frame_idx: int, pixel_scale: float) -> FrameVertices:
+        """
+        :param source: Snapshot the frame is built from
+        :param frame_idx: Index of the frame
+        :param pixel_scale: Pixel scale of the canvas
+        :return: FrameVertices without colors and Doppler lines, shared with the frame cache
+        """
+        self._use_source(source)
+        cache_key = (frame_idx, pixel_scale)
+        vertices = self.frame_cache.get(cache_key)
+        if vertices is None:
+            radar_data = self.frame_prefetcher.get(frame_idx)
+            if radar_data is None:
+                radar_data = source.build_frame(frame_idx, self.sweep_accumulator)
+            vertices = build_geometry(radar_data, pixel_scale)
+            self.frame_cache.put(cache_key, vertices)
+        # Keep the neighbourhood warm, also if the frame itself was cached
+        self.frame_prefetcher.prefetch_around(frame_idx, self.prefetch_frames, len(source.frame_index))
+        return vertices
+
+    def _use_source(self, source: FrameSource):
+        if source is self._source:
+            return
+        previous = self._source
+        if previous is None or source.sequence is not previous.sequence or source.columns is not previous.columns:
+            self.frame_cache.clear()
+        # The prefetcher has to build frames from the snapshot which knows the most frames
+        self.frame_prefetcher.reset(source.build_frame)
+        self._source = source
+
+    def shutdown(self):
+        self.frame_prefetcher.shutdown()
+        self._source = None
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Staged pipeline which keeps the vertex arrays of the displayed frame and only repeats the stages whose inputs
+changed
+"""
+
+import enum
+import dataclasses
+
+from typing import Callable
+
+from ..settings import Settings
+from .vertex_builder import FrameVertices, apply_colors, build_arrows
+
+
+class Stage(enum.IntFlag):
+    NONE = 0
+    GEOMETRY = 1
+    COLOR = 2
+    ARROWS = 4
+    ALL = GEOMETRY | COLOR | ARROWS
+
+
+class FramePipeline:
+    """
+    Runs the geometry, color and arrow stages of vertex_builder for the displayed frame. Every stage has a dirty flag
+    which is set when the inputs of the stage change or when it is invalidated explicitly:
+        - Geometry: frame and pixel scale. A new geometry also runs the color and arrow stages.
+        - Color: color option (only without shader colormaps) and dark mode
+        - Arrows: Doppler arrow visibility and arrowheads
+    Changes which only affect uniforms, like the Doppler arrow scale or the colormap, do not run any stage.
+    """
+
+    def __init__(self):
+        self.vertices = None
+        self.dirty = Stage.ALL
+        self._stage_keys = {}
+
+    def invalidate(self, stages: Stage = Stage.ALL):
+        """
+        Marks stages as dirty, e.g. after a new sequence was opened.
+        :param stages: Stages to repeat with the next update
+        :return: None
+        """
+        self.dirty |= stages
+
+    def update(self, geometry_key, build_geometry: Callable[[], FrameVertices], color_by: str,
+               settings: Settings) -> Stage:
+        """
+        Brings the vertex arrays up to date.
+        :param geometry_key: Hashable key identifying the geometry, e.g. frame index and pixel scale
+        :param build_geometry: Function returning the output of vertex_builder.build_geometry. The result is copied
+        before it is modified, so it may be shared with a cache.
+        :param color_by: Value of a ColorOpts entry
+        :param settings: Settings
+        :return: The stages which were run. Their output is in vertices and has to be uploaded.
+        """
+        stage_keys = {
+            Stage.GEOMETRY: geometry_key,
+            Stage.COLOR: (None if settings.shader_colormaps else color_by, settings.shader_colormaps,
+                          settings.dark_mode),
+            Stage.ARROWS: (settings.draw_doppler_arrows, settings.doppler_arrow_heads),
+        }
+        for stage, key in stage_keys.items():
+            if self._stage_keys.get(stage) != key:
+                self.dirty |= stage
+        if self.vertices is None:
+            self.dirty = Stage.ALL
+
+        stages = self.dirty
+        if Stage.GEOMETRY in stages:
+            geometry = build_geometry()
+            self.vertices = dataclasses.replace(geometry, detections=geometry.detections.copy())
+            stages = Stage.ALL
+        if Stage.COLOR in stages:
+            apply_colors(self.vertices, color_by, settings)
+        if Stage.ARROWS in stages:
+            build_arrows(self.vertices, settings)
+
+        self._stage_keys = stage_keys
+        self.dirty = Stage.NONE
+        return stages
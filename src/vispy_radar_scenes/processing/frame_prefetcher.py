@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Builds the frames around the current one in a thread pool, so that stepping through a sequence is a lookup
+"""
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict
+
+
+class FramePrefetcher:
+    """
+    Keeps the built frames of a window of frame indices around the current frame. Frames are built by build_fn in a
+    thread pool and are keyed by their frame index. Must only be used from one thread, see FrameGeometryBuilder; only
+    build_fn runs on the pool.
+    """
+
+    def __init__(self, num_workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="frame_prefetch")
+        self._futures: Dict[int, Future] = {}
+        self._build_fn = None
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self, build_fn: Callable[[int], object]):
+        """
+        Drops all prefetched frames, e.g. because a new sequence was loaded.
+        :param build_fn: Function which builds the frame for a given frame index. Called on the worker threads.
+        :return: None
+        """
+        for future in self._futures.values():
+            future.cancel()
+        self._futures = {}
+        self._build_fn = build_fn
+
+    def get(self, frame_idx: int):
+        """
+        Returns the frame with the given index. Waits for it if it is currently being built.
+        :param frame_idx: Index of the frame
+        :return: Result of build_fn for this frame, or None if the frame was not prefetched. A frame which is still
+        waiting in the queue is taken out of it and None is returned, so the caller can build it right away.
+        """
+        future = self._futures.get(frame_idx)
+        if future is None or future.cancel():
+            self._futures.pop(frame_idx, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return future.result()
+
+    def prefetch_around(self, frame_idx: int, num_frames: int, num_available: int):
+        """
+        Schedules the frames within num_frames of frame_idx, nearest first, and drops all frames outside of this range.
+        :param frame_idx: Index of the current frame
+        :param num_frames: Number of frames before and after frame_idx which are kept
+        :param num_available: Number of frames which can currently be built (frame indices are below this value)
+        :return: None
+        """
+        first = max(0, frame_idx - num_frames)
+        last = min(num_available - 1, frame_idx + num_frames)
+        for idx in list(self._futures):
+            if idx < first or idx > last:
+                self._futures.pop(idx).cancel()
+
+        for distance in range(1, num_frames + 1):
+            for idx in (frame_idx + distance, frame_idx - distance):
+                if first <= idx <= last and idx not in self._futures:
+                    self._futures[idx] = self._executor.submit(self._build_fn, idx)
+
+    def shutdown(self):
+        self.reset(None)
+        self._executor.shutdown(wait=False)
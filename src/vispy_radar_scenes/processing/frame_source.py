@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Immutable snapshot of the data frames are built from, which is handed from the GUI thread to the processing thread
+"""
+
+import dataclasses
+import numpy as np
+
+from dataclasses import dataclass
+from typing import Dict
+
+from ..data import FrameIndex
+from .frame_builder import build_frame, build_frame_from_columns
+from .sequence_vertices import sequence_radar_columns
+from .sweep_accumulator import SweepAccumulator
+
+
+@dataclass(frozen=True)
+class FrameSource:
+    """
+    The sequence, the frames indexed so far and, once they exist, the columns of the whole sequence in sequence
+    coordinates. The GUI thread replaces the snapshot whenever one of them changes and never changes it in place, so
+    the frames of a snapshot can be built on any thread.
+    """
+    sequence: object
+    frame_index: FrameIndex
+    max_lookback: int
+    columns: Dict[str, np.ndarray] = None
+
+    @classmethod
+    def create(cls, sequence, frame_index: FrameIndex, max_lookback: int,
+               columns: Dict[str, np.ndarray] = None) -> "FrameSource":
+        """
+        :param sequence: Sequence with the fields radar_data and odometry_data
+        :param frame_index: Frame index of the sequence, which may still grow. Only its current frames are used.
+        :param max_lookback: Maximum number of frames to look back for sweeps of the other sensors
+        :param columns: Columns returned by preprocess_sequence or sequence_radar_columns, None if there are none yet
+        :return: FrameSource
+        """
+        return cls(sequence, frame_index.snapshot(), max_lookback, columns)
+
+    def build_frame(self, frame_idx: int, accumulator: SweepAccumulator = None) -> Dict[str, np.ndarray]:
+        """
+        Builds the accumulated radar data of a frame. Frames are sliced out of the columns if there are any, otherwise
+        they are accumulated from the sequence, see build_frame.
+        :param frame_idx: Index of the frame
+        :param accumulator: SweepAccumulator to use instead of the one of the current thread
+        :return: Dictionary with one array per field holding the radar data of the most recent sweep of every sensor
+        """
+        if self.columns is not None:
+            return build_frame_from_columns(self.columns, self.frame_index, frame_idx, self.max_lookback)
+        return build_frame(self.sequence, self.frame_index, frame_idx, self.max_lookback, accumulator=accumulator)
+
+    def with_columns(self) -> "FrameSource":
+        """
+        Converts all indexed rows to sequence coordinates, see sequence_radar_columns. This takes a while for long
+        sequences.
+        :return: This snapshot if it has columns already, otherwise a copy with the columns
+        """
+        if self.columns is not None:
+            return self
+        return dataclasses.replace(self, columns=sequence_radar_columns(self.sequence, self.frame_index))
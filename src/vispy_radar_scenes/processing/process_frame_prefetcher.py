@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Builds the vertex arrays of the frames around the current one in worker processes. The workers write into the slots
+of a SharedVertexArena, only frame indices and drawing options travel between the processes.
+"""
+
+import warnings
+import multiprocessing
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Callable, Dict, List, Tuple
+
+from ..settings import Settings
+from ..data import FrameIndex
+from .frame_builder import build_frame_from_columns
+from .vertex_builder import FrameVertices, build_vertices
+from .sequence_preprocessor import load_preprocessed
+from .shared_vertex_arena import ArenaSpec, SharedVertexArena
+
+
+# State of a worker process, set by _init_worker
+_worker_state = {}
+
+
+def _init_worker(spec: ArenaSpec, columns_dir: str, frame_index: FrameIndex, max_lookback: int):
+    _worker_state["arena"] = SharedVertexArena.attach(spec)
+    _worker_state["columns"] = load_preprocessed(columns_dir, int(frame_index.ends[-1]))
+    _worker_state["frame_index"] = frame_index
+    _worker_state["max_lookback"] = max_lookback
+
+
+def _build_into_slot(slot: int, frame_idx: int, pixel_scale: float, color_by: str, settings: Settings) -> int:
+    """
+    Builds the vertex arrays of a frame into a slot of the arena. Runs in a worker process.
+    :return: Number of detections
+    """
+    radar_data = build_frame_from_columns(_worker_state["columns"], _worker_state["frame_index"], frame_idx,
+                                          _worker_state["max_lookback"])
+    vertices = build_vertices(radar_data, color_by, settings, pixel_scale)
+    _worker_state["arena"].write(slot, vertices)
+    return len(vertices.detections)
+
+
+def _options_key(pixel_scale: float, color_by: str, settings: Settings) -> tuple:
+    """
+    :return: The options which change the vertex arrays of a frame, see FramePipeline
+    """
+    return (pixel_scale, None if settings.shader_colormaps else color_by, settings.shader_colormaps,
+            settings.dark_mode, settings.draw_doppler_arrows, settings.doppler_arrow_heads)
+
+
+class ProcessFramePrefetcher:
+    """
+    Counterpart of FramePrefetcher for worker processes. Keeps the complete vertex arrays of a window of frames around
+    the current frame in the slots of a SharedVertexArena, keyed by frame index and the options which change them. The
+    workers read the columns written by preprocess_sequence and run all stages of vertex_builder, so the viewer uploads
+    the frames straight from the slots. Must only be used from one thread.
+    """
+
+    def __init__(self, num_workers: int, num_frames: int, on_ready: Callable[[], None] = None):
+        """
+        :param num_workers: Number of worker processes
+        :param num_frames: Number of frames before and after the current one which are prefetched
+        :param on_ready: Called when the current frame of prefetch_around has been built. Called from a thread of the
+        process pool.
+        """
+        self.num_workers = num_workers
+        # The window, the current frame and slots of dropped frames which are still being built
+        self.num_slots = 2 * num_frames + 1 + num_workers
+        self.arena = None
+        self._executor = None
+        self.on_ready = on_ready
+        self._entries: Dict[Tuple[int, tuple], Tuple[int, Future]] = {}
+        self._retiring: List[Tuple[int, Future]] = []
+        self._free: List[int] = []
+        # Key of the last frame get did not find ready, and the future on_ready waits for
+        self._missed = None
+        self._awaited = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def active(self) -> bool:
+        return self._executor is not None
+
+    def reset(self, columns_dir: str = None, frame_index: FrameIndex = None, max_lookback: int = 0):
+        """
+        Stops the workers of the previous sequence and frees the arena. If columns_dir is given, new workers are
+        started for this sequence.
+        :param columns_dir: Folder written by preprocess_sequence
+        :param frame_index: Complete frame index of the sequence
+        :param max_lookback: Maximum number of frames to look back for sweeps of the other sensors
+        :return: True if workers were started. False if columns_dir is None or does not hold complete columns of this
+        frame index.
+        """
+        if self._executor is not None:
+            for _, future in self._entries.values():
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.arena is not None:
+            self.arena.unlink()
+            self.arena = None
+        self._entries = {}
+        self._retiring = []
+        self._missed = None
+        self._awaited = None
+        if columns_dir is None or len(frame_index) == 0:
+            return False
+        # The workers open the columns on their own, they would fail on every task
+        if load_preprocessed(columns_dir, int(frame_index.ends[-1])) is None:
+            return False
+
+        # At most one sweep per sensor is accumulated, which bounds the size of a frame
+        sweep_rows = np.asarray(frame_index.ends) - np.asarray(frame_index.starts)
+        capacity = len(np.unique(frame_index.sensor_ids)) * int(np.max(sweep_rows))
+        self.arena = SharedVertexArena.create(self.num_slots, capacity)
+        self._free = list(range(self.num_slots))
+        frame_index = FrameIndex(**{attr: np.asarray(getattr(frame_index, attr)) for attr in
+                                    ["timestamps", "starts", "ends", "odometry_indices", "sensor_ids"]})
+        self._executor = ProcessPoolExecutor(max_workers=self.num_workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker,
+                                             initargs=(self.arena.spec, columns_dir, frame_index, max_lookback))
+        return True
+
+    def get(self, frame_idx: int, pixel_scale: float, color_by: str, settings: Settings) -> FrameVertices:
+        """
+        Returns the vertex arrays of a frame if they are ready. Does not wait for them, frames which are not ready are
+        scheduled by the next call of prefetch_around.
+        :param frame_idx: Index of the frame
+        :param pixel_scale: Pixel scale of the canvas
+        :param color_by: Value of a ColorOpts entry
+        :param settings: Settings
+        :return: FrameVertices whose detections and lines live in the arena. They stay valid until the next call of
+        prefetch_around which drops the frame. None if the frame is not ready. If building the frame failed, a warning
+        is issued, the workers are stopped and None is returned, the prefetcher is not active anymore.
+        """
+        key = (frame_idx, _options_key(pixel_scale, color_by, settings))
+        entry = self._entries.get(key)
+        if entry is None or not entry[1].done():
+            self.misses += 1
+            self._missed = key
+            return None
+        slot, future = entry
+        if future.exception() is not None:
+            warnings.warn(f"Frame worker process failed, frames are built without worker processes: "
+                          f"{future.exception()!r}")
+            self.misses += 1
+            self.reset()
+            return None
+        self.hits += 1
+        self._missed = None
+        return self.arena.read(slot)
+
+    def prefetch_around(self, frame_idx: int, num_frames: int, num_available: int, pixel_scale: float, color_by: str,
+                        settings: Settings):
+        """
+        Schedules frame_idx and the frames within num_frames of it, nearest first, and drops all other frames and the
+        frames built with other options. If the last call of get did not find frame_idx ready, on_ready is called once
+        it is built.
+        :param frame_idx: Index of the current frame
+        :param num_frames: Number of frames before and after frame_idx which are kept
+        :param num_available: Number of frames which can currently be built
+        :param pixel_scale: Pixel scale of the canvas
+        :param color_by: Value of a ColorOpts entry
+        :param settings: Settings
+        :return: None
+        """
+        options = _options_key(pixel_scale, color_by, settings)
+        first = max(0, frame_idx - num_frames)
+        last = min(num_available - 1, frame_idx + num_frames)
+        for key in list(self._entries):
+            if key[1] != options or key[0] < first or key[0] > last:
+                slot, future = self._entries.pop(key)
+                future.cancel()
+                self._retiring.append((slot, future))
+        # A slot can only be reused once no worker writes into it anymore
+        still_running = []
+        for slot, future in self._retiring:
+            if future.done():
+                self._free.append(slot)
+            else:
+                still_running.append((slot, future))
+        self._retiring = still_running
+
+        for distance in range(num_frames + 1):
+            for idx in sorted({frame_idx + distance, frame_idx - distance}, reverse=True):
+                key = (idx, options)
+                if first <= idx <= last and key not in self._entries and self._free:
+                    slot = self._free.pop()
+                    self._entries[key] = (slot, self._executor.submit(_build_into_slot, slot, idx, pixel_scale,
+                                                                      color_by, settings))
+
+        if self._missed == (frame_idx, options) and self.on_ready is not None:
+            current = self._entries.get(self._missed)
+            # Without a free slot, the frame is scheduled again once a dropped frame is finished
+            future = current[1] if current is not None else self._retiring[0][1] if self._retiring else None
+            if future is not None and future is not self._awaited:
+                self._awaited = future
+                future.add_done_callback(lambda _: self.on_ready())
+
+    def shutdown(self):
+        self.reset()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Converts all detections of a sequence to car and sequence coordinates in a process pool. The results are written to
+memory mapped .npy files, so the viewer only slices them.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import multiprocessing
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+from ..data import FrameIndex, source_signature
+from .sweep_accumulator import sweeps_to_sequence
+from .sequence_vertices import VERTEX_FIELDS
+
+
+PREPROCESS_VERSION = 3
+
+# Columns which are computed from range, azimuth, sensor mounting and odometry
+DERIVED_COLUMNS = ["x_cc", "y_cc", "x_seq", "y_seq", "azimuth_seq"]
+
+_META_FILE = "meta.json"
+_ODOMETRY_FILE = "frame_odometry.npy"
+_STARTS_FILE = "frame_starts.npy"
+_ENDS_FILE = "frame_ends.npy"
+
+
+def _column_file(name: str) -> str:
+    return f"{name}.npy"
+
+
+def preprocess_sequence(sequence, frame_index: FrameIndex, output_dir: str = None, num_workers: int = 0,
+                        frames_per_task: int = 256, source_file: str = None) -> Dict[str, np.ndarray]:
+    """
+    Computes the car and sequence coordinates of every detection of a sequence. The frames are split into ranges of
+    frames_per_task frames which are converted by a ProcessPoolExecutor, every worker writes its rows directly into
+    memory mapped output files.
+    :param sequence: Sequence with the fields radar_data and odometry_data
+    :param frame_index: Complete frame index of the sequence
+    :param output_dir: Folder the columns are written to. If it already holds the columns of this sequence, they are
+    opened instead. None writes to a temporary folder which is removed again, the columns stay mapped.
+    :param num_workers: Number of worker processes, 0 uses all cores
+    :param frames_per_task: Number of frames converted by one task
+    :param source_file: The radar_data.h5 file the sequence was loaded from. Its signature is stored with the columns,
+    so columns of a replaced file are not reused.
+    :return: Dictionary of read-only memory mapped columns in the format of sequence_radar_columns
+    """
+    n = int(frame_index.ends[-1]) if len(frame_index) > 0 else 0
+    if output_dir is not None:
+        columns = load_preprocessed(output_dir, n, source_file)
+        if columns is not None:
+            return columns
+        work_dir = output_dir + ".tmp"
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+    else:
+        work_dir = tempfile.mkdtemp(prefix="vispy_radar_scenes_")
+
+    # The inputs are written next to the outputs, so the workers only need the folder and the frame range
+    for name in VERTEX_FIELDS:
+        column = np.asarray(sequence.radar_data[name][:n])
+        np.save(os.path.join(work_dir, _column_file(name)), column.astype(np.dtype(column.dtype.str)))
+    for name in DERIVED_COLUMNS:
+        np.lib.format.open_memmap(os.path.join(work_dir, _column_file(name)), mode='w+', dtype=np.float32,
+                                  shape=(n,)).flush()
+    odometry = np.asarray(sequence.odometry_data)[np.asarray(frame_index.odometry_indices)]
+    np.save(os.path.join(work_dir, _ODOMETRY_FILE), np.ascontiguousarray(odometry))
+    np.save(os.path.join(work_dir, _STARTS_FILE), np.asarray(frame_index.starts))
+    np.save(os.path.join(work_dir, _ENDS_FILE), np.asarray(frame_index.ends))
+
+    tasks = [(work_dir, first, min(first + frames_per_task, len(frame_index)))
+             for first in range(0, len(frame_index), frames_per_task)]
+    if tasks:
+        # Spawned workers do not inherit the threads of the viewer
+        with ProcessPoolExecutor(max_workers=num_workers or None,
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            for _ in executor.map(_preprocess_frames, *zip(*tasks)):
+                pass
+
+    with open(os.path.join(work_dir, _META_FILE), "w") as f:
+        meta = {"version": PREPROCESS_VERSION, "rows": n}
+        if source_file is not None:
+            meta.update(source_signature(source_file))
+        json.dump(meta, f)
+
+    if output_dir is None:
+        columns = _open_columns(work_dir)
+        # The mapped files stay valid after the folder is removed, where the platform allows to remove them
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return columns
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(work_dir, output_dir)
+    return _open_columns(output_dir)
+
+
+def load_preprocessed(output_dir: str, rows: int, source_file: str = None) -> Dict[str, np.ndarray]:
+    """
+    Opens the columns written by preprocess_sequence.
+    :param output_dir: Folder passed to preprocess_sequence
+    :param rows: Number of indexed rows of the sequence
+    :param source_file: The radar_data.h5 file the sequence was loaded from. If given, the columns must have been
+    written for the current version of this file and of the scenes.json next to it, see source_signature.
+    :return: Dictionary of read-only memory mapped columns, or None if the folder does not hold a complete result for
+    this number of rows and source file
+    """
+    meta_file = os.path.join(output_dir, _META_FILE)
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file, "r") as f:
+        meta = json.load(f)
+    if meta.get("version") != PREPROCESS_VERSION or meta.get("rows") != rows:
+        return None
+    if source_file is not None and \
+            any(meta.get(key) != value for key, value in source_signature(source_file).items()):
+        return None
+    return _open_columns(output_dir)
+
+
+def _open_columns(directory: str) -> Dict[str, np.ndarray]:
+    return {name: np.load(os.path.join(directory, _column_file(name)), mmap_mode='r')
+            for name in VERTEX_FIELDS + DERIVED_COLUMNS}
+
+
+def _preprocess_frames(directory: str, first_frame: int, end_frame: int) -> int:
+    """
+    Converts the frames first_frame:end_frame. Runs in a worker process.
+    :param directory: Folder with the input and output columns
+    :param first_frame: Index of the first frame
+    :param end_frame: Index after the last frame
+    :return: Number of converted rows
+    """
+    starts = np.load(os.path.join(directory, _STARTS_FILE), mmap_mode='r')
+    ends = np.load(os.path.join(directory, _ENDS_FILE), mmap_mode='r')
+    odometry = np.load(os.path.join(directory, _ODOMETRY_FILE), mmap_mode='r')
+    columns = {name: np.load(os.path.join(directory, _column_file(name)), mmap_mode='r')
+               for name in VERTEX_FIELDS}
+    columns.update({name: np.load(os.path.join(directory, _column_file(name)), mmap_mode='r+')
+                    for name in DERIVED_COLUMNS})
+
+    start, end = int(starts[first_frame]), int(ends[end_frame - 1])
+    sweeps = {name: column[start:end] for name, column in columns.items()}
+    pose_indices = np.repeat(np.arange(first_frame, end_frame),
+                             ends[first_frame:end_frame] - starts[first_frame:end_frame])
+    sweeps_to_sequence(sweeps, odometry, pose_indices)
+
+    for name in DERIVED_COLUMNS:
+        columns[name].flush()
+    return int(ends[end_frame - 1]) - int(starts[first_frame])
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Vertex arrays of a whole sequence which stay resident on the GPU. Frames are drawn as ranges of these arrays.
+"""
+
+import numpy as np
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from ..settings import Settings
+from ..data import FrameIndex
+from .sweep_accumulator import sweeps_to_sequence
+from .vertex_builder import build_vertices
+
+
+# Fields of the radar data which are needed to build the vertex arrays
+VERTEX_FIELDS = ["timestamp", "sensor_id", "range_sc", "azimuth_sc", "rcs", "vr_compensated"]
+
+
+@dataclass
+class SequenceVertices:
+    """
+    Vertex arrays of all detections of a sequence, in the row order of the frame index. The detections of frame i are
+    the vertices frame_index.starts[i]:frame_index.ends[i], its Doppler lines are the vertices at vertices_per_arrow
+    times these offsets.
+    """
+    detections: np.ndarray
+    lines: np.ndarray
+    frame_index: FrameIndex
+
+    @property
+    def nbytes(self) -> int:
+        return self.detections.nbytes + self.lines.nbytes
+
+    @property
+    def vertices_per_arrow(self) -> int:
+        return len(self.lines) // len(self.detections) if len(self.detections) > 0 else 0
+
+    def detection_ranges(self, frame_idx: int, max_lookback: int) -> List[Tuple[int, int]]:
+        """
+        :param frame_idx: Index of the current frame
+        :param max_lookback: Maximum number of frames to look back for sweeps of the other sensors
+        :return: List of (first, count) vertex ranges of the sweeps which are displayed for frame_idx. Adjacent sweeps
+        are merged into one range.
+        """
+        ranges = []
+        for sweep_idx in self.frame_index.sweep_window(frame_idx, max_lookback):
+            start, end = self.frame_index.row_range(sweep_idx)
+            if ranges and sum(ranges[-1]) == start:
+                ranges[-1] = (ranges[-1][0], end - ranges[-1][0])
+            elif end > start:
+                ranges.append((start, end - start))
+        return ranges
+
+    def window_size(self, frame_idx: int, max_lookback: int) -> float:
+        """
+        :return: Time in ms between the oldest and the newest sweep which are displayed for frame_idx
+        """
+        sweeps = self.frame_index.sweep_window(frame_idx, max_lookback)
+        timestamps = self.frame_index.timestamps
+        return float(timestamps[sweeps[-1]] - timestamps[sweeps[0]]) / 10 ** 3
+
+
+def sequence_radar_columns(sequence, frame_index: FrameIndex) -> Dict[str, np.ndarray]:
+    """
+    Reads the columns of all indexed rows which are needed for the vertex arrays and converts all sweeps to sequence
+    coordinates in one vectorized call. This only depends on the sequence, so it is done once and reused for every
+    call of build_sequence_vertices.
+    :param sequence: Sequence with the fields radar_data and odometry_data
+    :param frame_index: Frame index of the sequence
+    :return: Dictionary of columns in the format of SweepAccumulator.view()
+    """
+    n = int(frame_index.ends[-1]) if len(frame_index) > 0 else 0
+    columns = {name: np.asarray(sequence.radar_data[name][:n]) for name in VERTEX_FIELDS}
+    for name in ["x_cc", "y_cc", "x_seq", "y_seq", "azimuth_seq"]:
+        columns[name] = np.empty(n, np.float32)
+
+    odometry = np.asarray(sequence.odometry_data)[np.asarray(frame_index.odometry_indices)]
+    sweeps_to_sequence(columns, odometry, frame_index.row_frames())
+    return columns
+
+
+def build_sequence_vertices(columns: Dict[str, np.ndarray], frame_index: FrameIndex, color_by: str,
+                            settings: Settings, pixel_scale: float) -> SequenceVertices:
+    """
+    Builds the vertex arrays of all detections of a sequence, see build_vertices. Detection sizes are scaled relative
+    to the smallest RCS value of the whole sequence instead of the current frame.
+    :param columns: Columns returned by sequence_radar_columns
+    :param frame_index: Frame index of the sequence
+    :param color_by: Value of a ColorOpts entry, ignored if settings.shader_colormaps is enabled
+    :param settings: Settings, used for dark mode, Doppler arrow scale and visibility
+    :param pixel_scale: Pixel scale of the canvas
+    :return: SequenceVertices
+    """
+    vertices = build_vertices(columns, color_by, settings, pixel_scale)
+    return SequenceVertices(vertices.detections, vertices.lines, frame_index)
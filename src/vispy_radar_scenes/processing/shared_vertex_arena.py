@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Shared memory arena of frame vertex slots. Worker processes write the vertex arrays of frames into the slots and
+the viewer uploads them from there, without pickling vertex data between the processes.
+"""
+
+import numpy as np
+
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+from ..gl_objects import GLRadarDetections, GLRadarDopplerLines
+from .vertex_builder import FrameVertices
+
+
+@dataclass(frozen=True)
+class ArenaSpec:
+    """
+    Everything a process needs to attach to an arena. Small and picklable, it is sent to the workers instead of the
+    vertex data.
+    """
+    name: str
+    num_slots: int
+    capacity: int
+
+
+class SharedVertexArena:
+    """
+    One shared memory block with num_slots slots, each holding the vertex arrays of a frame with up to capacity
+    detections. Layout:
+        - counts: int64 per slot, number of live detection rows
+        - line_counts: int64 per slot, number of live Doppler line rows
+        - window_sizes: float64 per slot, see FrameVertices.window_size
+        - detections: num_slots * capacity detection vertices
+        - lines: num_slots * capacity * lines_per_detection Doppler line vertices
+    The process which creates the arena owns the shared memory and has to call unlink(), processes which attach to
+    it only call close(). A slot must only be written by one process at a time, the owner hands out the slots.
+    """
+    dtype = GLRadarDetections.vertex_dtype
+    line_dtype = GLRadarDopplerLines.vertex_dtype
+    # Arrows with heads have the most vertices
+    lines_per_detection = len(GLRadarDopplerLines.arrow_offsets(True))
+
+    def __init__(self, spec: ArenaSpec, shm: shared_memory.SharedMemory):
+        self.spec = spec
+        self._shm = shm
+        n, capacity = spec.num_slots, spec.capacity
+        offset = 0
+        self.counts = np.ndarray(n, np.int64, shm.buf, offset)
+        offset += self.counts.nbytes
+        self.line_counts = np.ndarray(n, np.int64, shm.buf, offset)
+        offset += self.line_counts.nbytes
+        self.window_sizes = np.ndarray(n, np.float64, shm.buf, offset)
+        offset += self.window_sizes.nbytes
+        self.detections = np.ndarray((n, capacity), self.dtype, shm.buf, offset)
+        offset += self.detections.nbytes
+        self.lines = np.ndarray((n, capacity * self.lines_per_detection), self.line_dtype, shm.buf, offset)
+
+    @classmethod
+    def nbytes(cls, num_slots: int, capacity: int) -> int:
+        return num_slots * (3 * 8 + capacity * (cls.dtype.itemsize + cls.lines_per_detection * cls.line_dtype.itemsize))
+
+    @classmethod
+    def create(cls, num_slots: int, capacity: int) -> "SharedVertexArena":
+        """
+        Allocates a new arena.
+        :param num_slots: Number of slots
+        :param capacity: Maximum number of detections per slot
+        :return: SharedVertexArena owning the shared memory
+        """
+        shm = shared_memory.SharedMemory(create=True, size=max(1, cls.nbytes(num_slots, capacity)))
+        arena = cls(ArenaSpec(shm.name, num_slots, capacity), shm)
+        arena.counts[:] = 0
+        arena.line_counts[:] = 0
+        return arena
+
+    @classmethod
+    def attach(cls, spec: ArenaSpec) -> "SharedVertexArena":
+        """
+        Attaches to an arena created by the parent process.
+        :param spec: Spec of the arena
+        :return: SharedVertexArena which does not own the shared memory
+        """
+        # Child processes share the resource tracker of the creator, so attaching does not change who unlinks the block
+        return cls(spec, shared_memory.SharedMemory(name=spec.name))
+
+    def write(self, slot: int, vertices: FrameVertices):
+        """
+        Stores the vertex arrays of a frame in a slot.
+        :param slot: Index of the slot
+        :param vertices: Output of vertex_builder.build_vertices
+        :return: None
+        """
+        n, n_lines = len(vertices.detections), len(vertices.lines)
+        if n > self.spec.capacity:
+            raise ValueError(f"Frame with {n} detections does not fit into a slot of {self.spec.capacity}")
+        self.detections[slot, :n] = vertices.detections
+        self.lines[slot, :n_lines] = vertices.lines
+        self.window_sizes[slot] = vertices.window_size
+        self.counts[slot] = n
+        self.line_counts[slot] = n_lines
+
+    def read(self, slot: int) -> FrameVertices:
+        """
+        :param slot: Index of the slot
+        :return: FrameVertices whose detections and lines are views of the slot. They are only valid until the slot
+        is written again.
+        """
+        return FrameVertices(self.detections[slot, :int(self.counts[slot])],
+                             self.lines[slot, :int(self.line_counts[slot])], float(self.window_sizes[slot]))
+
+    def close(self):
+        # Views into the buffer have to be released before the shared memory can be closed
+        self.counts = self.line_counts = self.window_sizes = self.detections = self.lines = None
+        self._shm.close()
+
+    def unlink(self):
+        self.close()
+        self._shm.unlink()
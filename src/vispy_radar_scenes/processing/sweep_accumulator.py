@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Preallocated ring buffer holding the most recent sweep of every sensor
+"""
+
+import numpy as np
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+from ..data import FrameIndex
+from ..transform.sensor_mounting import default_mounting_table
+from ..transform.coordinate_transformation import transform_detections_car_to_sequence_batch
+
+
+# Fields which are computed per detection in addition to the fields of the radar data
+DERIVED_FIELDS = [("azimuth_seq", np.float32)]
+
+
+@dataclass
+class _Segment:
+    sensor_id: int
+    frame_idx: int
+    start: int
+    stop: int
+
+
+class SweepAccumulator:
+    """
+    Holds the most recent sweep of every sensor in one preallocated array per field (struct of arrays).
+    Detections are kept in sequence coordinates, so sweeps stay valid while the car moves on. Besides the fields of the
+    radar data, the columns contain the DERIVED_FIELDS.
+    The live rows are always one contiguous range, so the accumulated scene is returned as views without allocating.
+    New sweeps are appended at the end of the range. Replacing the oldest sweep only moves the beginning of the range
+    forward, like a ring buffer. The range is moved back to the start of the arrays once it reaches their end.
+    """
+
+    def __init__(self, capacity: int = 16384):
+        self.capacity = capacity
+        self.columns: Dict[str, np.ndarray] = {}
+        self._dtype = None
+        self._sequence = None
+        self._begin = 0
+        self._end = 0
+        self._segments: List[_Segment] = []
+
+    def __len__(self):
+        return self._end - self._begin
+
+    def clear(self):
+        self._begin = 0
+        self._end = 0
+        self._segments = []
+
+    def view(self) -> Dict[str, np.ndarray]:
+        """
+        :return: Dictionary mapping every field name to a view of the live rows of this field
+        """
+        return {name: column[self._begin:self._end] for name, column in self.columns.items()}
+
+    def sweep_slices(self):
+        """
+        :return: Slices of the sweeps within view(), ordered by frame index. The order of the sweeps in the buffer
+        depends on the order of the previous updates.
+        """
+        return [slice(segment.start - self._begin, segment.stop - self._begin)
+                for segment in sorted(self._segments, key=lambda segment: segment.frame_idx)]
+
+    def update(self, sequence, frame_index: FrameIndex, frame_idx: int, max_lookback: int) -> Dict[str, np.ndarray]:
+        """
+        Brings the buffer to the state of frame_idx: only the sweeps which are missing are read and converted to
+        sequence coordinates. The transformation into the car coordinate system of frame_idx is left to the renderer.
+        :param sequence: Sequence with the fields radar_data and odometry_data
+        :param frame_index: Frame index of the sequence
+        :param frame_idx: Index of the current frame
+        :param max_lookback: Maximum number of frames to look back for sweeps of the other sensors
+        :return: Views of the accumulated radar data, see view(). Only valid until the next update.
+        """
+        if sequence is not self._sequence:
+            self._sequence = sequence
+            self._allocate(sequence.radar_data.dtype, self.capacity)
+
+        wanted = {int(frame_index.sensor_ids[idx]): int(idx)
+                  for idx in frame_index.sweep_window(frame_idx, max_lookback)}
+        for segment in list(self._segments):
+            if wanted.get(segment.sensor_id) != segment.frame_idx:
+                self._remove(segment)
+
+        held = {segment.sensor_id for segment in self._segments}
+        for sensor_id, sweep_idx in sorted(wanted.items(), key=lambda item: item[1]):
+            if sensor_id not in held:
+                frame = frame_index.get_frame(sequence.radar_data, sequence.odometry_data, sweep_idx)
+                sweep = self._append(sensor_id, sweep_idx, frame.radar_data)
+                sweep_to_sequence(sweep, frame.odometry_data)
+
+        return self.view()
+
+    def _allocate(self, dtype: np.dtype, capacity: int):
+        self._dtype = dtype
+        self.capacity = capacity
+        self.columns = {name: np.empty(capacity, dtype[name]) for name in dtype.names}
+        self.columns.update({name: np.empty(capacity, field_type) for name, field_type in DERIVED_FIELDS})
+        self.clear()
+
+    def _remove(self, segment: _Segment):
+        n = segment.stop - segment.start
+        position = self._segments.index(segment)
+        del self._segments[position]
+        if position == 0:
+            self._begin = segment.stop
+        else:
+            for column in self.columns.values():
+                column[segment.start:self._end - n] = column[segment.stop:self._end]
+            for later in self._segments[position:]:
+                later.start -= n
+                later.stop -= n
+            self._end -= n
+        if not self._segments:
+            self.clear()
+
+    def _append(self, sensor_id: int, frame_idx: int, rows) -> Dict[str, np.ndarray]:
+        n = len(rows)
+        if self._end + n > self.capacity:
+            self._compact(len(self) + n)
+        start, stop = self._end, self._end + n
+        for name in self._dtype.names:
+            self.columns[name][start:stop] = rows[name]
+        self._segments.append(_Segment(sensor_id, frame_idx, start, stop))
+        self._end = stop
+        return {name: column[start:stop] for name, column in self.columns.items()}
+
+    def _compact(self, required: int):
+        """
+        Moves the live rows to the beginning of the arrays. The arrays are only reallocated if the required number of
+        rows exceeds the capacity.
+        """
+        if required > self.capacity:
+            old_columns = self.columns
+            self.columns = {name: np.empty(max(required, 2 * self.capacity), column.dtype)
+                            for name, column in old_columns.items()}
+            self.capacity = max(required, 2 * self.capacity)
+        else:
+            old_columns = self.columns
+        n = len(self)
+        for name, column in self.columns.items():
+            column[:n] = old_columns[name][self._begin:self._end]
+        for segment in self._segments:
+            segment.start -= self._begin
+            segment.stop -= self._begin
+        self._begin, self._end = 0, n
+
+
+def sweep_to_sequence(sweep: np.ndarray, odometry_data: np.ndarray) -> None:
+    """
+    Computes car and sequence coordinates of the detections of one sweep from range, azimuth and sensor mounting.
+    :param sweep: Radar data of one sweep as a dictionary of column views. The fields "x_cc", "y_cc", "x_seq", "y_seq"
+    and "azimuth_seq", the direction of the detection as seen from the sensor in sequence coordinates, are written in
+    place.
+    :param odometry_data: Odometry entry belonging to the sweep
+    :return: None
+    """
+    sweeps_to_sequence(sweep, odometry_data)
+
+
+def sweeps_to_sequence(sweeps, odometry_data: np.ndarray, pose_indices: np.ndarray = None) -> None:
+    """
+    Vectorized sweep_to_sequence for the detections of many sweeps with different odometry entries at once.
+    :param sweeps: Radar data as a dictionary of columns, see sweep_to_sequence. The output columns are written in
+    place and determine the dtype of the computation.
+    :param odometry_data: A single odometry entry, or an array of odometry entries indexed by pose_indices
+    :param pose_indices: Index of the odometry entry of every detection, None for a single odometry entry
+    :return: None
+    """
+    sensor_x, sensor_y, sensor_yaw = default_mounting_table.lookup(sweeps["sensor_id"])
+    range_sc = sweeps["range_sc"]
+    azimuth_cc = sweeps["azimuth_sc"] + sensor_yaw
+
+    x_cc = sweeps['x_cc']
+    y_cc = sweeps['y_cc']
+    x_cc[:] = range_sc * np.cos(azimuth_cc) + sensor_x
+    y_cc[:] = range_sc * np.sin(azimuth_cc) + sensor_y
+
+    transform_detections_car_to_sequence_batch(x_cc, y_cc, odometry_data, pose_indices,
+                                               out_x=sweeps['x_seq'], out_y=sweeps['y_seq'])
+
+    yaw_seq = np.asarray(odometry_data["yaw_seq"])
+    sweeps['azimuth_seq'][:] = azimuth_cc + (yaw_seq if pose_indices is None else yaw_seq[pose_indices])
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Fills the vertex arrays of the detection points and Doppler lines from accumulated radar data.
+The arrays are built in three stages: geometry, colors and arrows. Each stage only reads the output of the previous
+stages, so a stage can be repeated on its own when only its inputs change.
+"""
+
+import numpy as np
+
+from dataclasses import dataclass
+
+from ..settings import Settings
+from ..utils import ColorOpts, Colors
+from ..gl_objects import GLRadarDetections, GLRadarDopplerLines
+
+
+@dataclass
+class FrameVertices:
+    """
+    Ready-to-upload vertex arrays of one frame. Only the live rows are stored. Every detection has
+    vertices_per_arrow consecutive line vertices.
+    """
+    detections: np.ndarray
+    lines: np.ndarray
+    window_size: float
+    # Direction of every detection as seen from the sensor in sequence coordinates, the input of the arrow stage
+    angles: np.ndarray = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.detections.nbytes + self.lines.nbytes + (self.angles.nbytes if self.angles is not None else 0)
+
+    @property
+    def vertices_per_arrow(self) -> int:
+        return len(self.lines) // len(self.detections) if len(self.detections) > 0 else 0
+
+
+def build_vertices(radar_data, color_by: str, settings: Settings, pixel_scale: float) -> FrameVertices:
+    """
+    Computes positions, sizes and colors of all detections and, if enabled, the Doppler velocity lines.
+    Runs all three stages, see build_geometry, apply_colors and build_arrows.
+    :param radar_data: Accumulated radar data of a frame in sequence coordinates, see SweepAccumulator
+    :param color_by: Value of a ColorOpts entry, ignored if settings.shader_colormaps is enabled
+    :param settings: Settings, used for dark mode, Doppler arrow visibility and arrowheads
+    :param pixel_scale: Pixel scale of the canvas
+    :return: FrameVertices with n detection vertices and 2n line vertices, 6n with arrowheads and 0 if Doppler arrows
+    are disabled
+    """
+    vertices = build_geometry(radar_data, pixel_scale)
+    apply_colors(vertices, color_by, settings)
+    build_arrows(vertices, settings)
+    return vertices
+
+
+def build_geometry(radar_data, pixel_scale: float) -> FrameVertices:
+    """
+    Geometry stage: positions, sizes and the raw Doppler velocity, RCS and sensor id of all detections.
+    Positions are in sequence coordinates, the vertex shaders transform them into the car coordinate system of the
+    current frame. The raw values are used by the colormaps of the shaders and by apply_colors.
+    :param radar_data: Accumulated radar data of a frame in sequence coordinates, see SweepAccumulator
+    :param pixel_scale: Pixel scale of the canvas
+    :return: FrameVertices without colors and without Doppler lines
+    """
+    n = len(radar_data["x_seq"])
+
+    rcs = radar_data["rcs"]
+
+    detections = np.zeros(n, GLRadarDetections.vertex_dtype)
+    lines = np.zeros(0, GLRadarDopplerLines.vertex_dtype)
+
+    detections['a_position'][:, 0] = radar_data["x_seq"]
+    detections['a_position'][:, 1] = radar_data["y_seq"]
+    # TODO: Move these to settings
+    standard_size = 300
+    rcs_scaling = 10
+    if n > 0:
+        detections['a_size'] = pixel_scale * (standard_size + rcs_scaling*(rcs-np.min(rcs)))
+
+    detections['a_doppler'] = radar_data["vr_compensated"]
+    detections['a_rcs'] = rcs
+    detections['a_sensor_id'] = radar_data["sensor_id"]
+
+    window_size = 0.0
+    if n > 0:
+        window_size = (np.max(radar_data["timestamp"]) - np.min(radar_data["timestamp"])) / 10 ** 3
+
+    return FrameVertices(detections, lines, window_size, np.array(radar_data["azimuth_seq"], np.float32))
+
+
+def apply_colors(vertices: FrameVertices, color_by: str, settings: Settings):
+    """
+    Color stage: writes the outline color and, if settings.shader_colormaps is disabled, the fill color of every
+    detection in place. Existing Doppler lines get the fill color of their detection.
+    :param vertices: Output of build_geometry
+    :param color_by: Value of a ColorOpts entry, ignored if settings.shader_colormaps is enabled
+    :param settings: Settings, used for dark mode and shader colormaps
+    :return: None
+    """
+    detections = vertices.detections
+    if settings.dark_mode:
+        detections['a_fg_color'] = settings.canvas_dark_mode_clear_color
+    else:
+        detections['a_fg_color'] = settings.canvas_light_mode_clear_color
+
+    bg_color = detections['a_bg_color']
+    if settings.shader_colormaps:
+        bg_color[:] = Colors.unknown_sensor_color
+    elif color_by == ColorOpts.SENSORID.value:
+        Colors.sensor_id_colors(detections['a_sensor_id'], out=bg_color)
+    elif color_by == ColorOpts.DOPPLER.value:
+        base_color_positive = Colors.hex_to_rgba(Colors.red)
+        base_color_negative = Colors.hex_to_rgba(Colors.blue)
+        doppler_vals = np.clip(detections['a_doppler'], -10, 10)
+        doppler_vals = 1 / 20.0 * (doppler_vals + 10)
+        Colors.color_gradient_array(base_color_negative, base_color_positive, doppler_vals, out=bg_color)
+    elif color_by == ColorOpts.RCS.value:
+        base_color = Colors.hex_to_rgba(Colors.green)
+        rcs_vals = np.clip(detections['a_rcs'], -20, 20)
+        rcs_vals = 1 / 40.0 * (rcs_vals + 20)
+        Colors.color_gradient_array((0, 0, 0, 0), base_color, rcs_vals, out=bg_color)
+    else:
+        bg_color[:] = Colors.unknown_sensor_color
+
+    k = vertices.vertices_per_arrow
+    if k > 0:
+        vertices.lines.reshape(len(detections), k)['a_color'] = bg_color[:, None]
+
+
+def build_arrows(vertices: FrameVertices, settings: Settings):
+    """
+    Arrow stage: builds the Doppler line vertices from the detections. The arrows are expanded in the vertex shader,
+    their vertices only carry the attributes of the detection and a constant offset, so they do not depend on the
+    arrow scale.
+    :param vertices: Output of apply_colors. vertices.lines is replaced.
+    :param settings: Settings, used for Doppler arrow visibility and arrowheads
+    :return: None
+    """
+    detections = vertices.detections
+    n = len(detections)
+    arrow_offsets = GLRadarDopplerLines.arrow_offsets(settings.doppler_arrow_heads)
+    vertices_per_arrow = len(arrow_offsets) if settings.draw_doppler_arrows else 0
+
+    vertices.lines = np.zeros(vertices_per_arrow * n, GLRadarDopplerLines.vertex_dtype)
+    if vertices_per_arrow > 0 and n > 0:
+        arrows = vertices.lines.reshape(n, vertices_per_arrow)
+        arrows['a_position'] = detections['a_position'][:, None]
+        arrows['a_color'] = detections['a_bg_color'][:, None]
+        for name in ['a_doppler', 'a_rcs', 'a_sensor_id']:
+            arrows[name] = detections[name][:, None]
+        arrows['a_angle'] = vertices.angles[:, None]
+        arrows['a_offset'] = arrow_offsets
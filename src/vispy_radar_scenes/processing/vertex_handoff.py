@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Double-buffered handoff of ready-to-upload vertex arrays from a processing thread to the GUI thread
+"""
+
+import threading
+import numpy as np
+
+from dataclasses import dataclass
+
+from .frame_pipeline import Stage
+from .vertex_builder import FrameVertices
+
+
+@dataclass
+class HandoffSlot:
+    """
+    One of the two buffers of a VertexHandoff. The arrays keep their capacity between frames, vertices holds views of
+    the live rows.
+    """
+    detections: np.ndarray
+    lines: np.ndarray
+    vertices: FrameVertices = None
+    frame_idx: int = -1
+    stages: Stage = Stage.NONE
+
+
+class VertexHandoff:
+    """
+    Two slots of vertex arrays shared by one producer and one consumer thread. The producer writes a frame into the
+    slot which the consumer does not hold and publishes it, the consumer takes the latest published slot and releases
+    it after the upload. A published frame which was not taken yet is replaced by the next one, its stages are merged
+    into the next frame, so the consumer still uploads every buffer which changed.
+    """
+
+    def __init__(self, detection_dtype: np.dtype, line_dtype: np.dtype, initial_size: int = 8192):
+        self._lock = threading.Lock()
+        self._slots = [HandoffSlot(np.zeros(initial_size, detection_dtype), np.zeros(2 * initial_size, line_dtype))
+                       for _ in range(2)]
+        self._ready = None
+        self._in_use = None
+        self._pending = Stage.NONE
+        self.dropped_frames = 0
+
+    def write(self, vertices: FrameVertices, frame_idx: int, stages: Stage):
+        """
+        Copies the vertex arrays of a frame into a free slot and publishes it. Called by the producer.
+        :param vertices: Vertex arrays of the frame, they can be modified again after the call
+        :param frame_idx: Index of the frame
+        :param stages: Stages which changed the vertex arrays since the previous frame
+        :return: None
+        """
+        with self._lock:
+            # Prefer the slot which neither the consumer holds nor is published
+            free = [i for i in (0, 1) if i != self._in_use]
+            index = next((i for i in free if i != self._ready), free[0])
+            if index == self._ready:
+                # The consumer did not take the published frame, it is overwritten
+                self._ready = None
+                self.dropped_frames += 1
+        slot = self._slots[index]
+
+        slot.detections = self._fit(slot.detections, len(vertices.detections))
+        slot.lines = self._fit(slot.lines, len(vertices.lines))
+        detections = slot.detections[:len(vertices.detections)]
+        lines = slot.lines[:len(vertices.lines)]
+        detections[:] = vertices.detections
+        lines[:] = vertices.lines
+        slot.vertices = FrameVertices(detections, lines, vertices.window_size)
+        slot.frame_idx = frame_idx
+
+        with self._lock:
+            if self._ready is not None:
+                self.dropped_frames += 1
+            self._pending |= stages
+            slot.stages = self._pending
+            self._ready = index
+
+    def take(self) -> HandoffSlot:
+        """
+        Takes the latest published slot. Called by the consumer, which has to call release() after the upload.
+        :return: HandoffSlot, or None if no new frame was published since the last call
+        """
+        with self._lock:
+            if self._ready is None:
+                return None
+            self._in_use, self._ready = self._ready, None
+            self._pending = Stage.NONE
+            return self._slots[self._in_use]
+
+    def release(self):
+        with self._lock:
+            self._in_use = None
+
+    def clear(self):
+        """
+        Drops a published frame which was not taken yet.
+        :return: None
+        """
+        with self._lock:
+            self._ready = None
+            self._pending = Stage.NONE
+
+    @staticmethod
+    def _fit(array: np.ndarray, count: int) -> np.ndarray:
+        """Grows an array geometrically until it holds count rows"""
+        if count <= len(array):
+            return array
+        return np.zeros(max(count, 2 * len(array)), array.dtype)
@@ -1 +1,4 @@
-from .load_sequence_worker import LoadSequenceWorker
+from .load_sequence_worker import LoadSequenceWorker, LoadProgress
+from .render_scheduler import RenderScheduler
+from .playback_engine import PlaybackEngine
+from .frame_processing_worker import FrameProcessingWorker, FrameJob, SequenceJob
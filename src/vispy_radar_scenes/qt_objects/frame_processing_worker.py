@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Builds the vertex arrays of the displayed frame, and of the GPU resident sequence, on a dedicated processing thread
+"""
+
+import sys
+import functools
+import threading
+import dataclasses
+
+from dataclasses import dataclass
+from typing import Callable
+from PyQt5 import QtCore
+
+from ..settings import Settings
+from ..processing import FramePipeline, FrameVertices, FrameSource, VertexHandoff, SequenceVertices, Stage
+
+
+@dataclass
+class FrameJob:
+    """
+    Everything the processing thread needs to build a frame. settings is a copy and source a snapshot, so the GUI can
+    change its settings and load more frames while the frame is built.
+    """
+    frame_idx: int
+    pixel_scale: float
+    color_by: str
+    settings: Settings
+    source: FrameSource
+
+
+@dataclass
+class SequenceJob:
+    """
+    Request to build the vertex arrays of the whole sequence for the GPU resident mode. key identifies the options
+    the arrays are built with and is passed back with sequence_ready.
+    """
+    key: tuple
+    pixel_scale: float
+    color_by: str
+    settings: Settings
+    source: FrameSource
+
+
+class FrameProcessingWorker(QtCore.QObject):
+    """
+    Runs a FramePipeline on a dedicated thread and writes the results into a VertexHandoff. frame_ready is emitted for
+    every published frame, the GUI thread then takes the slot from handoff, uploads it and releases it again.
+    Only the latest request is processed, requests which arrive while a frame is built replace each other.
+    The vertex arrays of the whole sequence are built on the same thread and emitted with sequence_ready, the GUI
+    thread uploads them. They are emitted together with the FrameSource of the job, which then holds the columns of the
+    sequence, so later jobs do not convert the sequence again. A pending frame is built first, so the timeline stays
+    responsive while a sequence is waiting.
+    """
+    frame_ready = QtCore.pyqtSignal()
+    sequence_ready = QtCore.pyqtSignal(object, object, object)
+
+    def __init__(self, pipeline: FramePipeline, build_geometry: Callable[[FrameSource, int, float], FrameVertices],
+                 handoff: VertexHandoff, build_sequence: Callable[[SequenceJob], SequenceVertices] = None):
+        """
+        :param pipeline: Pipeline which is only used by the processing thread from now on
+        :param build_geometry: Function returning the geometry of a frame for a FrameSource, a frame index and a pixel
+        scale. Called on the processing thread.
+        :param handoff: Handoff the vertex arrays are written to
+        :param build_sequence: Function returning the vertex arrays of the whole sequence for a SequenceJob whose source
+        has columns. Called on the processing thread.
+        """
+        super().__init__()
+        self.pipeline = pipeline
+        self.build_geometry = build_geometry
+        self.handoff = handoff
+        self.build_sequence = build_sequence
+
+        self._condition = threading.Condition()
+        self._job = None
+        self._sequence_job = None
+        self._invalidated = Stage.NONE
+        self._busy = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="frame_processing", daemon=True)
+        self._thread.start()
+
+    def request(self, job: FrameJob):
+        """
+        Requests a frame to be built. Replaces a request which was not started yet.
+        :param job: The frame to build
+        :return: None
+        """
+        with self._condition:
+            self._job = job
+            self._condition.notify_all()
+
+    def invalidate(self, stages: Stage = Stage.ALL):
+        """
+        Marks stages of the pipeline as dirty before the next frame is built, e.g. after the canvas dropped the vertex
+        buffers. Does not wait for the processing thread.
+        :param stages: Stages to repeat with the next frame
+        :return: None
+        """
+        with self._condition:
+            self._invalidated |= stages
+
+    def request_sequence(self, job: SequenceJob):
+        """
+        Requests the vertex arrays of the whole sequence to be built. Replaces a request which was not started yet.
+        :param job: Options to build the vertex arrays with
+        :return: None
+        """
+        with self._condition:
+            self._sequence_job = job
+            self._condition.notify_all()
+
+    def cancel(self):
+        """
+        Drops the pending requests and waits until the frame or sequence which is being built is done, e.g. before the
+        sequence is replaced. Frames which were published but not taken yet are dropped, too.
+        :return: None
+        """
+        with self._condition:
+            self._job = None
+            self._sequence_job = None
+            self._condition.wait_for(lambda: not self._busy)
+        self.handoff.clear()
+
+    def shutdown(self):
+        with self._condition:
+            self._job = None
+            self._sequence_job = None
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._job is not None or self._sequence_job is not None or
+                                         self._stopped)
+                if self._stopped:
+                    return
+                if self._job is not None:
+                    job, self._job = self._job, None
+                    self.pipeline.invalidate(self._invalidated)
+                    self._invalidated = Stage.NONE
+                else:
+                    job, self._sequence_job = self._sequence_job, None
+                self._busy = True
+            try:
+                if isinstance(job, SequenceJob):
+                    source = job.source.with_columns()
+                    self.sequence_ready.emit(job.key, self.build_sequence(dataclasses.replace(job, source=source)),
+                                             source)
+                else:
+                    self._process_frame(job)
+            except:
+                (type_, value, traceback) = sys.exc_info()
+                sys.excepthook(type_, value, traceback)
+                self.pipeline.invalidate()
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _process_frame(self, job: FrameJob):
+        stages = self.pipeline.update((job.frame_idx, job.pixel_scale),
+                                      functools.partial(self.build_geometry, job.source, job.frame_idx,
+                                                        job.pixel_scale),
+                                      job.color_by, job.settings)
+        if stages:
+            self.handoff.write(self.pipeline.vertices, job.frame_idx, stages)
+            self.frame_ready.emit()
@@ -3,36 +3,260 @@
 """Loads RadarScenes data and provides to Qt nodes
 """
 
+import os
 import sys
+import json
+import time
+import socket
+import warnings
+import threading
 
+from dataclasses import dataclass
 from PyQt5 import QtCore
-from radar_scenes.sequence import Sequence
+
+from ..settings import Settings
+from ..utils import get_file_logger
+from ..data import H5SequenceReader, write_sequence_cache, load_sequence_cache, scene_odometry_table, \
+    sequence_cache_dir
+from ..processing import preprocess_sequence
+
+
+@dataclass
+class LoadProgress:
+    """
+    Progress of a sequence load within one phase (e.g. "read" or "cache_write").
+    """
+    phase: str
+    bytes_read: int = 0
+    bytes_total: int = 0
+    rows_parsed: int = 0
+    rows_total: int = 0
+    frames_indexed: int = 0
+    phase_elapsed: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def fraction(self) -> float:
+        """Fraction of the phase which is done, in [0, 1]"""
+        if self.bytes_total > 0:
+            return min(1.0, self.bytes_read / self.bytes_total)
+        if self.rows_total > 0:
+            return min(1.0, self.rows_parsed / self.rows_total)
+        return 1.0
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second within this phase"""
+        if self.phase_elapsed <= 0:
+            return 0.0
+        return self.bytes_read / self.phase_elapsed
 
 
 class LoadSequenceWorker(QtCore.QObject):
+    """
+    Loads a sequence progressively. sequence_opened is emitted as soon as the file is open, followed by one
+    frames_indexed signal per block of the file with the frames that are ready to be displayed. loading_done is
+    emitted with the complete frame index at the end.
+    Every signal except finished carries the generation of the load, so that the receiver can drop results of loads
+    which have been superseded. A running load can be aborted with cancel(). The receiver of sequence_opened owns the
+    sequence and has to close it, also if it drops the signal as superseded.
+    progress is emitted with a LoadProgress for every block. The totals of every phase are written to the load log.
+    If settings.preprocess_sequence is enabled, the whole sequence is converted to sequence coordinates after
+    loading_done and sequence_preprocessed is emitted with the columns and their folder, None for a temporary folder.
+    """
     finished = QtCore.pyqtSignal()
-    loading_done = QtCore.pyqtSignal(object, object)
-    loading_failed = QtCore.pyqtSignal()
+    sequence_opened = QtCore.pyqtSignal(int, object)
+    frames_indexed = QtCore.pyqtSignal(int, object)
+    loading_done = QtCore.pyqtSignal(int, object, object)
+    loading_failed = QtCore.pyqtSignal(int)
+    progress = QtCore.pyqtSignal(int, object)
+    sequence_preprocessed = QtCore.pyqtSignal(int, object, object)
 
-    def __init__(self, filename):
+    def __init__(self, filename, settings: Settings, generation: int = 0):
         super().__init__()
         self.filename = filename
+        self.settings = settings
+        self.generation = generation
+        self._cancel_event = threading.Event()
+        self._logger = get_file_logger("loader", settings.load_log_file)
+        self._load_start = 0.0
+        self._phase_start = 0.0
+
+    def cancel(self):
+        """
+        Requests the load to stop. May be called from any thread. The worker stops at the next block boundary and
+        emits finished without emitting loading_done.
+        :return: None
+        """
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
 
     def load(self):
+        self._load_start = time.perf_counter()
         try:
-            sequence = Sequence.from_json(self.filename)
-            cur_timestamp = sequence.first_timestamp
-            timestamps = [cur_timestamp]
-            while True:
-                cur_timestamp = sequence.next_timestamp_after(cur_timestamp)
-                if cur_timestamp is None:
-                    break
-                timestamps.append(cur_timestamp)
-            self.loading_done.emit(sequence, timestamps)
+            if self.filename.endswith(".h5"):
+                loaded = self.stream(self.filename, sequence_name=None, lazy=True, scene_odometry=None)
+                output_dir = None
+                source_file = self.filename
+            else:
+                loaded = self.load_json()
+                source_file = os.path.join(os.path.dirname(self.filename), "radar_data.h5")
+                output_dir = os.path.join(sequence_cache_dir(self.settings.sequence_cache_folder, source_file),
+                                          self.settings.preprocess_folder) if self.settings.use_sequence_cache else None
+            if loaded is not None and self.settings.preprocess_sequence and not self.cancelled:
+                self.preprocess(*loaded, output_dir, source_file)
 
             self.finished.emit()
         except:
             (type_, value, traceback) = sys.exc_info()
             sys.excepthook(type_, value, traceback)
-            self.loading_failed.emit()
+            self.loading_failed.emit(self.generation)
             self.finished.emit()
+
+    def load_json(self):
+        """
+        Loads the sequence described by a scenes.json file. If a columnar cache exists, it is memory mapped.
+        Otherwise the radar_data.h5 file next to it is streamed and the cache is written afterwards.
+        :return: Tuple (sequence, frame_index) or None, if the load was cancelled
+        """
+        sequence_folder = os.path.dirname(self.filename)
+        h5_filename = os.path.join(sequence_folder, "radar_data.h5")
+        cache_dir = sequence_cache_dir(self.settings.sequence_cache_folder, h5_filename)
+        use_cache = self.settings.use_sequence_cache and not self.settings.lazy_h5_loading
+
+        if use_cache:
+            self.begin_phase()
+            loaded = load_sequence_cache(cache_dir, h5_filename)
+            if loaded is not None:
+                sequence, frame_index = loaded
+                self.sequence_opened.emit(self.generation, sequence)
+                self.frames_indexed.emit(self.generation, frame_index)
+                self.end_phase(LoadProgress("cache_open", rows_parsed=len(sequence.radar_data),
+                                            rows_total=len(sequence.radar_data), frames_indexed=len(frame_index)))
+                self.loading_done.emit(self.generation, sequence, frame_index)
+                return loaded
+
+        with open(self.filename, "r") as f:
+            scenes_json = json.load(f)
+        if self.cancelled:
+            return None
+        loaded = self.stream(h5_filename, scenes_json["sequence_name"], lazy=self.settings.lazy_h5_loading,
+                             scene_odometry=scene_odometry_table(scenes_json["scenes"]))
+        if loaded is None:
+            return None
+        sequence, frame_index = loaded
+
+        if use_cache:
+            self.begin_phase()
+            try:
+                write_sequence_cache(cache_dir, h5_filename, sequence, frame_index)
+            except OSError as e:
+                warnings.warn(f"Could not write sequence cache to {cache_dir}: {e}")
+                self.fail_phase("cache_write", e)
+            else:
+                n_bytes = sequence.radar_data.nbytes
+                self.end_phase(LoadProgress("cache_write", bytes_read=n_bytes, bytes_total=n_bytes,
+                                            rows_parsed=len(sequence.radar_data), rows_total=len(sequence.radar_data),
+                                            frames_indexed=len(frame_index)))
+        return loaded
+
+    def preprocess(self, sequence, frame_index, output_dir, source_file):
+        """
+        Converts all detections of the sequence to sequence coordinates in a process pool, see preprocess_sequence.
+        :param sequence: The loaded sequence
+        :param frame_index: Complete frame index of the sequence
+        :param output_dir: Folder for the memory mapped columns, None for a temporary folder
+        :param source_file: The radar_data.h5 file of the sequence, used to detect outdated columns in output_dir
+        :return: None
+        """
+        self.begin_phase()
+        columns = preprocess_sequence(sequence, frame_index, output_dir, self.settings.preprocess_workers,
+                                      source_file=source_file)
+        n_rows = len(columns["x_seq"])
+        n_bytes = sum(column.nbytes for column in columns.values())
+        self.end_phase(LoadProgress("preprocess", bytes_read=n_bytes, bytes_total=n_bytes, rows_parsed=n_rows,
+                                    rows_total=n_rows, frames_indexed=len(frame_index)))
+        self.sequence_preprocessed.emit(self.generation, columns, output_dir)
+
+    def stream(self, h5_filename, sequence_name, lazy, scene_odometry):
+        """
+        Reads a radar_data.h5 file block by block and emits the frames of every block as soon as they are indexed.
+        :param h5_filename: Full path to the radar_data.h5 file
+        :param sequence_name: Name of the sequence, None to use the folder name
+        :param lazy: If True, the radar data stays in the file and is read frame by frame later on
+        :param scene_odometry: Odometry indices of the scenes of scenes.json, None to use the closest odometry entry
+        :return: Tuple (sequence, frame_index) or None, if the load was cancelled
+        """
+        reader = H5SequenceReader(h5_filename, sequence_name, lazy=lazy,
+                                  chunk_rows=self.settings.h5_read_chunk_rows,
+                                  chunk_cache_bytes=self.settings.h5_chunk_cache_bytes,
+                                  scene_odometry=scene_odometry)
+        self.begin_phase()
+        if self.cancelled:
+            # The sequence has not been handed out yet, nobody else closes it
+            reader.close()
+            reader.sequence.close()
+            return None
+        try:
+            self.sequence_opened.emit(self.generation, reader.sequence)
+            for batch in reader:
+                if self.cancelled:
+                    break
+                self.frames_indexed.emit(self.generation, batch)
+                self.report(self.reader_progress(reader))
+        finally:
+            reader.close()
+        if self.cancelled:
+            # The receiver of sequence_opened owns the sequence and closes it once it is replaced or dropped
+            return None
+        self.end_phase(self.reader_progress(reader))
+        self.loading_done.emit(self.generation, reader.sequence, reader.frame_index)
+        return reader.sequence, reader.frame_index
+
+    @staticmethod
+    def reader_progress(reader: H5SequenceReader) -> LoadProgress:
+        return LoadProgress("read", bytes_read=reader.bytes_read, bytes_total=reader.bytes_total,
+                            rows_parsed=reader.rows_read, rows_total=reader.rows_total,
+                            frames_indexed=len(reader.frame_index))
+
+    def begin_phase(self):
+        self._phase_start = time.perf_counter()
+
+    def report(self, progress: LoadProgress):
+        """
+        Fills in the elapsed times and emits the progress signal.
+        :param progress: Progress of the current phase
+        :return: None
+        """
+        now = time.perf_counter()
+        progress.phase_elapsed = now - self._phase_start
+        progress.elapsed = now - self._load_start
+        self.progress.emit(self.generation, progress)
+
+    def end_phase(self, progress: LoadProgress):
+        """
+        Emits the final progress of a phase and appends it to the load log.
+        :param progress: Progress at the end of the phase
+        :return: None
+        """
+        self.report(progress)
+        self._logger.info("host=%s\tfile=%s\tphase=%s\tbytes=%d\trows=%d\tframes=%d\t"
+                          "phase_s=%.3f\ttotal_s=%.3f\tMB/s=%.1f",
+                          socket.gethostname(), self.filename, progress.phase, progress.bytes_read,
+                          progress.rows_parsed, progress.frames_indexed, progress.phase_elapsed, progress.elapsed,
+                          progress.throughput / 1e6)
+
+    def fail_phase(self, phase: str, error: Exception):
+        """
+        Appends a phase which did not complete to the load log. No progress is emitted for it.
+        :param phase: Name of the phase
+        :param error: The error which ended the phase
+        :return: None
+        """
+        now = time.perf_counter()
+        self._logger.warning("host=%s\tfile=%s\tphase=%s\tfailed=%s\tphase_s=%.3f\ttotal_s=%.3f",
+                             socket.gethostname(), self.filename, phase, error, now - self._phase_start,
+                             now - self._load_start)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Plays a sequence back in real time according to the timestamps of its frames
+"""
+
+import time
+import collections
+import numpy as np
+
+from PyQt5 import QtCore
+
+
+class PlaybackEngine(QtCore.QObject):
+    """
+    Emits frame_due with the frame whose timestamp matches the wall clock time since playback started, scaled by the
+    speed multiplier. The sequence time is derived from the wall clock on every tick instead of advancing frame by
+    frame, so when plotting falls behind, the frames in between are dropped and the playback does not drift.
+    The viewer calls frame_shown once a frame has been uploaded. The next frame is only emitted after the previous one
+    was shown, so frames are dropped here instead of piling up in the render scheduler or the processing thread. If no
+    frame is shown for stall_timeout seconds, the next frame is emitted anyway.
+    Achieved and target rate are measured with the shown frames over the last rate_window seconds:
+        - target_rate: frames per second the sequence advanced by, i.e. the rate needed to show every frame
+        - achieved_rate: frames per second which were actually shown
+    """
+    frame_due = QtCore.pyqtSignal(int)
+    state_changed = QtCore.pyqtSignal(bool)
+
+    min_speed = 0.1
+    max_speed = 20.0
+    rate_window = 1.0
+    stall_timeout = 1.0
+
+    def __init__(self, min_interval: float = 0.0, parent: QtCore.QObject = None):
+        """
+        :param min_interval: Minimum time in s between two frames, e.g. the refresh interval of the screen. Frames
+        which are due more often are dropped.
+        :param parent: Parent QObject
+        """
+        super().__init__(parent)
+        self.min_interval = min_interval
+        self.timestamps = np.zeros(0, np.int64)
+        self.current_frame = 0
+        self.dropped_frames = 0
+        self._speed = 1.0
+        self._playing = False
+        self._wall_start = 0.0
+        self._seq_start = 0
+        self._history = collections.deque()
+        # Frame which was emitted but not shown yet, the time it was emitted and the last shown frame
+        self._awaited = None
+        self._awaited_since = 0.0
+        self._last_shown = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.timeout.connect(self.tick)
+
+    @property
+    def playing(self) -> bool:
+        return self._playing
+
+    @property
+    def speed(self) -> float:
+        return self._speed
+
+    @speed.setter
+    def speed(self, value: float):
+        self._speed = float(np.clip(value, self.min_speed, self.max_speed))
+        if self._playing:
+            self._anchor(self.current_frame)
+            self._schedule(self._sequence_time())
+
+    def set_timestamps(self, timestamps: np.ndarray):
+        """
+        Sets the timestamps in microseconds of all frames. Can be called while a sequence is still loading.
+        :param timestamps: Sorted array with one timestamp per frame
+        :return: None
+        """
+        self.timestamps = timestamps
+        if self._playing and not self._timer.isActive():
+            self._schedule(self._sequence_time())
+
+    def play(self, frame_idx: int):
+        """
+        Starts the playback at a frame.
+        :param frame_idx: Index of the first frame
+        :return: None
+        """
+        if len(self.timestamps) < 2:
+            return
+        if frame_idx >= len(self.timestamps) - 1:
+            frame_idx = 0
+        self.current_frame = frame_idx
+        self.dropped_frames = 0
+        self._history.clear()
+        self._last_shown = None
+        self._playing = True
+        self._anchor(frame_idx)
+        self.state_changed.emit(True)
+        self._emit(frame_idx)
+        self._schedule(self._sequence_time())
+
+    def pause(self):
+        self._timer.stop()
+        self._awaited = None
+        if self._playing:
+            self._playing = False
+            self.state_changed.emit(False)
+
+    def toggle(self, frame_idx: int):
+        """
+        Pauses a running playback or starts it at frame_idx.
+        :param frame_idx: Index of the frame to start at
+        :return: None
+        """
+        if self._playing:
+            self.pause()
+        else:
+            self.play(frame_idx)
+
+    def seek(self, frame_idx: int):
+        """
+        Continues a running playback at another frame, e.g. after the user moved the timeline.
+        :param frame_idx: Index of the frame
+        :return: None
+        """
+        self.current_frame = frame_idx
+        if self._playing:
+            # The frame of the user replaces the emitted one
+            self._awaited = None
+            self._last_shown = None
+            self._anchor(frame_idx)
+            self._schedule(self._sequence_time())
+
+    def frame_shown(self, frame_idx: int):
+        """
+        Feedback of the viewer that a frame has been uploaded. Frames between the previously shown frame and this one
+        count as dropped.
+        :param frame_idx: Index of the shown frame
+        :return: None
+        """
+        if not self._playing or frame_idx == self._last_shown:
+            # Frames which are plotted again, e.g. after an option changed, are not counted
+            return
+        if self._last_shown is not None and frame_idx > self._last_shown + 1:
+            self.dropped_frames += frame_idx - self._last_shown - 1
+        self._last_shown = frame_idx
+        self._record(frame_idx)
+        if self._awaited is not None and frame_idx >= self._awaited:
+            self._awaited = None
+            # A tick may have been held back for this frame
+            self.tick()
+
+    def tick(self):
+        """
+        Emits the frame which is due at the current wall clock time and schedules the next tick.
+        :return: None
+        """
+        if not self._playing:
+            return
+        waited = time.perf_counter() - self._awaited_since
+        if self._awaited is not None and waited < self.stall_timeout:
+            # frame_shown ticks again, the timer only guards against frames which are never shown
+            self._timer.start(int(np.ceil((self.stall_timeout - waited) * 1000)))
+            return
+        seq_time = self._sequence_time()
+        frame_idx = int(np.searchsorted(self.timestamps, seq_time, side='right')) - 1
+        frame_idx = min(max(frame_idx, self.current_frame), len(self.timestamps) - 1)
+        if frame_idx > self.current_frame:
+            self.current_frame = frame_idx
+            self._emit(frame_idx)
+        if self.current_frame >= len(self.timestamps) - 1:
+            self.pause()
+            return
+        self._schedule(seq_time)
+
+    @property
+    def target_rate(self) -> float:
+        """Frames per second needed to show every frame at the current speed"""
+        if len(self._history) < 2:
+            return 0.0
+        (t0, f0, _), (t1, f1, _) = self._history[0], self._history[-1]
+        return (f1 - f0) / (t1 - t0) if t1 > t0 else 0.0
+
+    @property
+    def achieved_rate(self) -> float:
+        """Frames per second which were shown"""
+        if len(self._history) < 2:
+            return 0.0
+        (t0, _, n0), (t1, _, n1) = self._history[0], self._history[-1]
+        return (n1 - n0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def _emit(self, frame_idx: int):
+        self._awaited = frame_idx
+        self._awaited_since = time.perf_counter()
+        self.frame_due.emit(frame_idx)
+
+    def _anchor(self, frame_idx: int):
+        self._wall_start = time.perf_counter()
+        self._seq_start = int(self.timestamps[frame_idx])
+
+    def _sequence_time(self) -> float:
+        """Timestamp in microseconds which is due at the current wall clock time"""
+        return self._seq_start + (time.perf_counter() - self._wall_start) * self._speed * 10 ** 6
+
+    def _schedule(self, seq_time: float):
+        """
+        Starts the timer for the next frame after current_frame.
+        :param seq_time: Sequence time of the current tick
+        :return: None
+        """
+        next_frame = self.current_frame + 1
+        if next_frame >= len(self.timestamps):
+            return
+        wait = (self.timestamps[next_frame] - seq_time) / (self._speed * 10 ** 6)
+        self._timer.start(int(np.ceil(max(wait, self.min_interval, 0.0) * 1000)))
+
+    def _record(self, frame_idx: int):
+        """
+        Appends a shown frame to the history the rates are computed from.
+        :param frame_idx: Index of the shown frame
+        :return: None
+        """
+        now = time.perf_counter()
+        shown = self._history[-1][2] + 1 if self._history else 0
+        self._history.append((now, frame_idx, shown))
+        while len(self._history) > 2 and now - self._history[0][0] > self.rate_window:
+            self._history.popleft()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Coalesces frame requests of the UI so that at most one frame is rendered per display refresh
+"""
+
+import time
+
+from PyQt5 import QtCore, QtGui
+
+
+class RenderScheduler(QtCore.QObject):
+    """
+    Collects frame requests, e.g. from the timeline slider, and emits frame_due with the latest requested frame at most
+    once per refresh interval. Requests which are replaced by a newer one before they are rendered are counted as
+    skipped frames. A request after an idle period is rendered with the next iteration of the event loop, so all
+    requests which are already queued are coalesced into it.
+    """
+    frame_due = QtCore.pyqtSignal(int)
+
+    def __init__(self, refresh_rate: float = 0.0, parent: QtCore.QObject = None):
+        """
+        :param refresh_rate: Maximum number of frames per second. 0 uses the refresh rate of the primary screen.
+        :param parent: Parent QObject
+        """
+        super().__init__(parent)
+        if refresh_rate <= 0:
+            screen = QtGui.QGuiApplication.primaryScreen()
+            refresh_rate = screen.refreshRate() if screen is not None and screen.refreshRate() > 0 else 60.0
+        self.interval = 1.0 / refresh_rate
+
+        self.pending = None
+        self.requests = 0
+        self.rendered_frames = 0
+        self.skipped_frames = 0
+        self._last_render = -float("inf")
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.timeout.connect(self.flush)
+
+    def request(self, frame_idx: int):
+        """
+        Requests a frame to be rendered. Replaces a pending request of another frame.
+        :param frame_idx: Index of the frame
+        :return: None
+        """
+        self.requests += 1
+        if self.pending is not None and self.pending != frame_idx:
+            self.skipped_frames += 1
+        self.pending = frame_idx
+        if not self._timer.isActive():
+            wait = self._last_render + self.interval - time.perf_counter()
+            self._timer.start(int(max(0.0, wait) * 1000))
+
+    def flush(self):
+        """
+        Emits frame_due for the pending request, if any. Called by the timer, can be called directly to render
+        immediately.
+        :return: None
+        """
+        self._timer.stop()
+        if self.pending is None:
+            return
+        frame_idx = self.pending
+        self.pending = None
+        self._last_render = time.perf_counter()
+        self.rendered_frames += 1
+        self.frame_due.emit(frame_idx)
+
+    def cancel(self):
+        """
+        Drops a pending request without rendering it.
+        :return: None
+        """
+        self._timer.stop()
+        self.pending = None
+
+    def reset_statistics(self):
+        self.requests = 0
+        self.rendered_frames = 0
+        self.skipped_frames = 0
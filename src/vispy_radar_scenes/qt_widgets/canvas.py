@@ -11,10 +11,9 @@ from vispy import app, gloo
 from vispy.util.transforms import perspective, translate, rotate
 
 from ..settings import Settings
-from ..utils import ColorOpts, Colors
-from ..gl_objects import GLObjectBuffer, GLRadarDetections, GLRadarDopplerLines, GLCircle
-
-from radar_scenes.sensors import get_mounting
+from ..utils import ColorOpts
+from ..gl_objects import GLObjectBuffer, GLRadarDetections, GLRadarDopplerLines, GLCircle, GLColormap
+from ..processing import FrameVertices, SequenceVertices
 
 #gloo.gl.use_gl('gl+')
 
@@ -26,9 +25,17 @@ class Canvas(app.Canvas):
     def __init__(self, settings: Settings):
         app.Canvas.__init__(self, keys='interactive', size=(800, 600))
         self.settings = settings
-
-        self.gl_object_buffer['detection_points'] = GLRadarDetections()
-        self.gl_object_buffer['detection_vel_lines'] = GLRadarDopplerLines()
+        # Vertex arrays of the whole sequence if it is resident on the GPU
+        self.resident_sequence = None
+
+        # Detection and line buffers grow with the scene, two line vertices are needed per detection
+        self.gl_object_buffer['detection_points'] = GLRadarDetections(self.settings.vertex_buffer_initial_size)
+        self.gl_object_buffer['detection_vel_lines'] = GLRadarDopplerLines(2 * self.settings.vertex_buffer_initial_size)
+        for name in ['detection_points', 'detection_vel_lines']:
+            self.gl_object_buffer[name].shrink_after = self.settings.vertex_buffer_shrink_after
+        self.colormap = GLColormap()
+        self.set_color_by(list(ColorOpts)[0].value)
+        self.set_doppler_scale(self.settings.doppler_arrow_scale)
 
         min_circle_range = 10
         max_circle_range = 100
@@ -47,6 +54,7 @@ class Canvas(app.Canvas):
 
         for obj in self.gl_object_buffer.values():
             obj.model = rotate(90, (0, 0, 1))
+            obj.seq_to_car = np.eye(3)
 
         self.update_object_scaling()
         self.apply_zoom()
@@ -62,15 +70,6 @@ class Canvas(app.Canvas):
         else:
             gloo.set_state('translucent', clear_color=self.settings.canvas_dark_mode_clear_color)
 
-    """
-    def on_key_press(self, event):
-        if event.text == ' ':
-            if self.timer.running:
-                self.timer.stop()
-            else:
-                self.timer.start()
-    """
-
     def on_resize(self, event):
         self.apply_zoom()
 
@@ -85,7 +84,8 @@ class Canvas(app.Canvas):
     def on_draw(self, event):
         gloo.clear()
         for obj in self.gl_object_buffer.values():
-            obj.program.draw(obj.type)
+            if obj.visible:
+                obj.draw()
 
     def apply_zoom(self):
         gloo.set_viewport(0, 0, self.physical_size[0], self.physical_size[1])
@@ -98,87 +98,115 @@ class Canvas(app.Canvas):
             obj.view = translate((0, 0, -self.translate))
             obj.scale = max(1/100.0, (1/self.translate) * min(500, self.translate)/500)
 
-    def update_scene(self, radar_data, color_by):
-        n = len(radar_data["x_cc"])
+    def set_color_by(self, color_by: str):
+        """
+        Selects the colormap of the detection points and Doppler lines. This only changes uniforms, the vertex data is
+        not touched. If shader colormaps are disabled, the colors of the vertices are used.
+        :param color_by: Value of a ColorOpts entry
+        :return: None
+        """
+        for name in ['detection_points', 'detection_vel_lines']:
+            self.colormap.apply(self.gl_object_buffer[name].program,
+                                color_by if self.settings.shader_colormaps else None)
+        self.update()
 
-        sensor_id = radar_data["sensor_id"]
-        azimuth_sc = radar_data["azimuth_sc"]
-        rcs = radar_data["rcs"]
-        x_cc = radar_data["x_cc"]
-        y_cc = radar_data["y_cc"]
-        velocity_compensated = radar_data["vr_compensated"]
+    def set_doppler_scale(self, scale: float):
+        """
+        Sets the length of the Doppler arrows per m/s. The arrows are expanded in the vertex shader, so this only
+        changes a uniform.
+        :param scale: Arrow length per m/s of Doppler velocity
+        :return: None
+        """
+        self.gl_object_buffer['detection_vel_lines'].doppler_scale = scale
+        self.update()
 
-        sensor_yaw = np.array([get_mounting(s_id)["yaw"] for s_id in sensor_id])
+    def set_seq_to_car(self, seq_to_car: np.ndarray):
+        """
+        Sets the transformation from sequence to car coordinates of the current frame. Detection points and Doppler
+        lines are uploaded in sequence coordinates and transformed in the vertex shader.
+        :param seq_to_car: Transformation matrix with shape (3,3), see trafo_matrix_seq_to_car
+        :return: None
+        """
+        self.gl_object_buffer['detection_points'].seq_to_car = seq_to_car
+        self.gl_object_buffer['detection_vel_lines'].seq_to_car = seq_to_car
+        self.update()
 
+    def upload_vertices(self, vertices: FrameVertices, upload_detections: bool = True, upload_lines: bool = True):
+        """
+        Copies the vertex arrays of a frame into the buffers of the detection points and Doppler lines. Only the live
+        rows are uploaded and drawn, rows behind them keep stale data.
+        :param vertices: Vertex arrays of the frame
+        :param upload_detections: Whether the detection points changed
+        :param upload_lines: Whether the Doppler lines changed
+        :return: None
+        """
+        if self.resident_sequence is not None:
+            self.release_sequence()
+            upload_detections = upload_lines = True
         detections = self.gl_object_buffer['detection_points']
         lines = self.gl_object_buffer['detection_vel_lines']
 
-        detections.data['a_position'] = np.zeros((detections.buffer_size, 3))
-        detections.data['a_position'][:n, 0] = x_cc
-        detections.data['a_position'][:n, 1] = y_cc
-        # TODO: Move these to settings
-        standard_size = 300
-        rcs_scaling = 10
-        detections.data['a_size'][:n] = \
-            self.pixel_scale * (standard_size + rcs_scaling*(rcs-np.min(rcs)))
-
-        if self.settings.dark_mode:
-            detections.data['a_fg_color'] = self.settings.canvas_dark_mode_clear_color
-        else:
-            detections.data['a_fg_color'] = self.settings.canvas_light_mode_clear_color
-
-        detections.data['a_fg_color'][n:][-1] = 0
-
-        if color_by == ColorOpts.SENSORID.value:
-            colors = [Colors.hex_to_rgba(Colors.sensor_id_to_color[x['sensor_id']]) for x in radar_data]
-            detections.data['a_bg_color'][:n] = colors
-            lines.data['a_color'][:n * 2:2] = colors
-            lines.data['a_color'][1:n * 2:2] = colors
-        elif color_by == ColorOpts.DOPPLER.value:
-            base_color_positive = Colors.hex_to_rgba(Colors.red)
-            base_color_negative = Colors.hex_to_rgba(Colors.blue)
-            doppler_vals = radar_data["vr_compensated"]
-            doppler_vals = np.clip(doppler_vals, -10, 10)
-            doppler_vals = 1 / 20.0 * (doppler_vals + 10)
-            colors = list(map(lambda val: Colors.color_gradient(
-                            base_color_negative, base_color_positive, val), doppler_vals))
-            detections.data['a_bg_color'][:n] = colors
-            lines.data['a_color'][:n * 2:2] = colors
-            lines.data['a_color'][1:n * 2:2] = colors
-        elif color_by == ColorOpts.RCS.value:
-            base_color = Colors.hex_to_rgba(Colors.green)
-            rcs_vals = radar_data["rcs"]
-            rcs_vals = np.clip(rcs_vals, -20, 20)
-            rcs_vals = 1 / 40.0 * (rcs_vals + 20)
-            colors = list(map(lambda val: tuple(val*x for x in base_color), rcs_vals))
-            detections.data['a_bg_color'][:n] = colors
-            lines.data['a_color'][:n * 2:2] = colors
-            lines.data['a_color'][1:n * 2:2] = colors
-        else:
-            detections.data['a_bg_color'] = 0.95, 0.95, 1, 1
-            lines.data['a_color'] = 0.95, 0.95, 1, 1
-
-        detections.data['a_bg_color'][n:][-1] = 0
-        lines.data['a_color'][n * 2:][-1] = 0
+        if upload_detections:
+            n = len(vertices.detections)
+            detections.reserve(n)
+            detections.data[:n] = vertices.detections
+            detections.mark_dirty(0, n)
+            detections.live_count = n
+            detections.update()
 
-
-        if self.settings.draw_doppler_arrows:
+        if not self.settings.draw_doppler_arrows:
+            lines.visible = False
+        elif upload_lines:
             lines.visible = True
-            lines.data['a_position'] = np.zeros((detections.buffer_size, 3))
-            lines.data['a_position'][:n*2:2, 0] = x_cc
-            lines.data['a_position'][:n*2:2, 1] = y_cc
+            n_lines = len(vertices.lines)
+            lines.reserve(n_lines)
+            lines.data[:n_lines] = vertices.lines
+            lines.mark_dirty(0, n_lines)
+            lines.live_count = n_lines
+            lines.update()
 
-            vx = velocity_compensated * np.cos(azimuth_sc + sensor_yaw)
-            vy = velocity_compensated * np.sin(azimuth_sc + sensor_yaw)
+        self.update()
 
-            scale = self.settings.doppler_arrow_scale
-            lines.data['a_position'][1:n*2:2, 0] = x_cc + scale * vx
-            lines.data['a_position'][1:n*2:2, 1] = y_cc + scale * vy
-        else:
-            lines.visible = False
+    def upload_sequence(self, vertices: SequenceVertices):
+        """
+        Uploads the vertex arrays of a whole sequence once. Frames are then displayed with show_ranges(), which does
+        not upload any vertex data.
+        :param vertices: Vertex arrays of the sequence
+        :return: None
+        """
+        detections = self.gl_object_buffer['detection_points']
+        lines = self.gl_object_buffer['detection_vel_lines']
 
-        #circle_20m.update()
-        lines.update()
-        detections.update()
+        self.resident_sequence = vertices
+        detections.set_data(vertices.detections)
+        detections.draw_ranges = []
+        lines.visible = self.settings.draw_doppler_arrows and len(vertices.lines) > 0
+        if lines.visible:
+            lines.set_data(vertices.lines)
+        lines.draw_ranges = []
 
         self.update()
+
+    def show_ranges(self, ranges):
+        """
+        Selects the detections of the resident sequence which are drawn.
+        :param ranges: List of (first, count) ranges of detection vertices, see SequenceVertices.detection_ranges
+        :return: None
+        """
+        self.gl_object_buffer['detection_points'].draw_ranges = ranges
+        k = self.resident_sequence.vertices_per_arrow
+        self.gl_object_buffer['detection_vel_lines'].draw_ranges = [(k * first, k * count) for first, count in ranges]
+        self.update()
+
+    def release_sequence(self):
+        """
+        Replaces the vertex arrays of the resident sequence with empty buffers of the initial size for per-frame
+        uploads.
+        :return: None
+        """
+        self.resident_sequence = None
+        for name in ['detection_points', 'detection_vel_lines']:
+            obj = self.gl_object_buffer[name]
+            obj.draw_ranges = None
+            obj.set_data(np.zeros(obj.initial_buffer_size, obj.vertex_dtype))
+            obj.live_count = 0
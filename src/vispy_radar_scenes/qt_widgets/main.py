@@ -4,6 +4,9 @@
 """
 
 import os
+import warnings
+import functools
+import dataclasses
 import numpy as np
 
 from PyQt5 import QtCore, QtWidgets, QtGui
@@ -11,21 +14,44 @@ from PyQt5 import QtCore, QtWidgets, QtGui
 from .canvas import Canvas
 from ..settings import Settings
 from ..utils import set_stylesheet, package_resource_path, ColorOpts
-from ..qt_objects import LoadSequenceWorker
+from ..qt_objects import LoadSequenceWorker, RenderScheduler, PlaybackEngine, FrameProcessingWorker, FrameJob, \
+    SequenceJob
+from ..data import SequenceData, FrameIndex
+from ..processing import FrameGeometryBuilder, FrameSource, FramePipeline, FrameVertices, Stage, VertexHandoff, \
+    ProcessFramePrefetcher, build_sequence_vertices, SequenceVertices
+from ..gl_objects import GLRadarDetections, GLRadarDopplerLines
 from ..qt_theme import breeze_resources  # Loads stylesheet
 
-from ..transform.coordinate_transformation import transform_detections_sequence_to_car, transform_detections_car_to_sequence
-from radar_scenes.sensors import get_mounting
+from ..transform.coordinate_transformation import transform_detections_sequence_to_car, trafo_matrix_seq_to_car
 
 
 class MainWindow(QtWidgets.QMainWindow):
+    # Emitted by the process pool when the awaited frame of the worker processes is ready
+    prefetched_frame_ready = QtCore.pyqtSignal()
+
     def __init__(self, settings: Settings, canvas: Canvas):
         QtWidgets.QMainWindow.__init__(self)
 
         self.settings = settings
         self.canvas = canvas
 
-        self.scene_buffer = []
+        self.geometry_builder = FrameGeometryBuilder(self.settings.frame_cache_bytes, self.settings.prefetch_workers,
+                                                     self.settings.prefetch_frames)
+        self.process_prefetcher = ProcessFramePrefetcher(self.settings.frame_worker_processes,
+                                                         self.settings.prefetch_frames,
+                                                         self.prefetched_frame_ready.emit)
+        self.frame_pipeline = FramePipeline()
+        # With a processing thread, the pipeline and the geometry builder are only used by that thread. It builds the
+        # frames from the FrameSource snapshot of the job, never from the attributes of the main window.
+        self.frame_worker = None
+        if self.settings.processing_thread:
+            handoff = VertexHandoff(GLRadarDetections.vertex_dtype, GLRadarDopplerLines.vertex_dtype,
+                                    self.settings.vertex_buffer_initial_size)
+            self.frame_worker = FrameProcessingWorker(self.frame_pipeline, self.geometry_builder.geometry, handoff,
+                                                      self.sequence_vertices)
+        self.render_scheduler = RenderScheduler(self.settings.render_refresh_rate, self)
+        self.playback = PlaybackEngine(self.render_scheduler.interval, self)
+        self.playback.speed = self.settings.playback_speed
 
         self.create_ui()
 
@@ -34,7 +60,21 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.showMaximized()
         self.sequence = None
+        self.frame_index = None
         self.timestamps = []
+        self.sequence_loaded = False
+
+        # Sequence coordinates of all detections and the options the GPU resident vertex arrays were built with
+        self.sequence_columns = None
+        # Snapshot of the sequence, the frame index and the columns, see update_frame_source
+        self.frame_source = None
+        self.resident_key = None
+        # Options of the resident vertex arrays which are being built on the processing thread
+        self.requested_resident_key = None
+
+        # Generation of the most recent load. Results of older, superseded loads are dropped.
+        self.load_generation = 0
+        self.running_loads = {}
 
         if self.settings.dark_mode:
             set_stylesheet(self.settings.dark_stylesheet)
@@ -43,8 +83,17 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.timeline_spinbox.valueChanged.connect(self.timeline_slider.setValue)
         self.timeline_slider.valueChanged.connect(self.on_slider_value_changed)
-        self.color_by_list.currentIndexChanged.connect(self.plot_frames)
-        self.doppler_scale_slider.valueChanged.connect(self.plot_frames)
+        self.color_by_list.currentIndexChanged.connect(self.request_plot)
+        self.doppler_scale_slider.valueChanged.connect(self.request_plot)
+        self.render_scheduler.frame_due.connect(self.on_frame_due)
+        self.prefetched_frame_ready.connect(self.request_plot)
+        if self.frame_worker is not None:
+            self.frame_worker.frame_ready.connect(self.on_frame_processed)
+            self.frame_worker.sequence_ready.connect(self.on_sequence_vertices_ready)
+        self.playback.frame_due.connect(self.timeline_slider.setValue)
+        self.playback.state_changed.connect(self.on_playback_state_changed)
+        self.play_button.clicked.connect(self.toggle_playback)
+        self.playback_speed_spinbox.valueChanged.connect(self.on_playback_speed_changed)
         self.doppler_arrows_cb.stateChanged.connect(self.on_doppler_cb_clicked)
 
     def toggle_stylesheet(self):
@@ -177,9 +226,28 @@ class MainWindow(QtWidgets.QMainWindow):
         self.timeline_label.setSizePolicy(
             QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed))
 
+        # Playback: Play button, speed multiplier and achieved rate
+        self.play_button = QtWidgets.QPushButton("Play")
+        self.play_button.setSizePolicy(
+            QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed))
+        self.playback_speed_spinbox = QtWidgets.QDoubleSpinBox()
+        self.playback_speed_spinbox.setRange(PlaybackEngine.min_speed, PlaybackEngine.max_speed)
+        self.playback_speed_spinbox.setSingleStep(0.1)
+        self.playback_speed_spinbox.setDecimals(1)
+        self.playback_speed_spinbox.setSuffix("x")
+        self.playback_speed_spinbox.setValue(self.settings.playback_speed)
+        self.playback_speed_spinbox.setSizePolicy(
+            QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed))
+        self.playback_rate_label = QtWidgets.QLabel()
+        self.playback_rate_label.setSizePolicy(
+            QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed))
+
         self.timeline_grid_layout.addWidget(self.timeline_slider, 0, 0, 1, 8)
+        self.timeline_grid_layout.addWidget(self.play_button, 1, 0)
         self.timeline_grid_layout.addWidget(self.timeline_label, 1, 1)
         self.timeline_grid_layout.addWidget(self.timeline_spinbox, 1, 2)
+        self.timeline_grid_layout.addWidget(self.playback_speed_spinbox, 1, 3)
+        self.timeline_grid_layout.addWidget(self.playback_rate_label, 1, 4)
 
         self.main_grid_layout.addLayout(self.timeline_grid_layout, 1, 0)
 
@@ -218,6 +286,22 @@ class MainWindow(QtWidgets.QMainWindow):
             "Frame {}/{}.\t\t Current Timestamp: {}.\t\t Time Window Size: {}s".format(0, 0, 0, 0.0))
         self.status.addPermanentWidget(self.status_label)
 
+        self.load_progress_bar = QtWidgets.QProgressBar()
+        self.load_progress_bar.setRange(0, 1000)
+        self.load_progress_bar.setFixedWidth(300)
+        self.load_progress_bar.setVisible(False)
+        self.status.addWidget(self.load_progress_bar)
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        for worker, _ in self.running_loads.values():
+            worker.cancel()
+        self.playback.pause()
+        if self.frame_worker is not None:
+            self.frame_worker.shutdown()
+        self.geometry_builder.shutdown()
+        self.process_prefetcher.shutdown()
+        super().closeEvent(event)
+
     def keyPressEvent(self, event: QtGui.QKeyEvent) -> None:
         if event.key() == QtCore.Qt.Key_Right:
             if self.timeline_slider.value() < self.timeline_slider.maximum():
@@ -225,6 +309,24 @@ class MainWindow(QtWidgets.QMainWindow):
         elif event.key() == QtCore.Qt.Key_Left:
             if self.timeline_slider.value() > self.timeline_slider.minimum():
                 self.timeline_slider.setValue(self.timeline_slider.value() - 1)
+        elif event.key() == QtCore.Qt.Key_Space:
+            self.toggle_playback()
+
+    def toggle_playback(self):
+        """
+        Starts the playback at the current frame or pauses it.
+        :return: None
+        """
+        self.playback.toggle(self.timeline_slider.value())
+
+    def on_playback_state_changed(self, playing: bool):
+        self.play_button.setText("Pause" if playing else "Play")
+        if not playing:
+            self.playback_rate_label.setText("")
+
+    def on_playback_speed_changed(self, speed: float):
+        self.settings.playback_speed = speed
+        self.playback.speed = speed
 
     def on_doppler_cb_clicked(self, state):
         """
@@ -243,12 +345,13 @@ class MainWindow(QtWidgets.QMainWindow):
             self.doppler_h_layout.setContentsMargins(20, 0, 0, 0)
             self.doppler_scale_slider.setVisible(False)
             self.doppler_scale_label.setVisible(False)
-        self.plot_frames()
+        self.request_plot()
 
     def on_slider_value_changed(self, value: int):
         """
         Callback function which is called when the slider is moved.
-        The value of the timeline spinbox is updated and the scene is plotted.
+        The value of the timeline spinbox is updated and the frame is requested from the render scheduler, which
+        coalesces the values of fast drags and only plots the latest one.
         :param value: Current value of the slider.
         :return:
         """
@@ -259,41 +362,173 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.detection_info_label.setText("No detection selected.")
 
+        # The user moved the timeline during playback, continue from there
+        if self.playback.playing and value != self.playback.current_frame:
+            self.playback.seek(value)
+
+        self.render_scheduler.request(value)
+
+    def request_plot(self):
+        """
+        Requests the current frame to be plotted with the next display refresh, e.g. after an option changed.
+        :return: None
+        """
+        self.render_scheduler.request(self.timeline_slider.value())
+
+    def on_frame_due(self, frame_idx: int):
+        """
+        Callback function of the render scheduler. Plots the latest requested frame, which is the current value of the
+        timeline slider.
+        :param frame_idx: Index of the frame
+        :return: None
+        """
         self.plot_frames()
+        if self.playback.playing:
+            self.playback_rate_label.setText("{:.1f}/{:.1f} fps, {} dropped".format(
+                self.playback.achieved_rate, self.playback.target_rate, self.playback.dropped_frames))
 
     def open_sequence(self):
         """
         Dialog for opening a measurement sequence.
-        Only json files can be loaded. Actual loading is done by the load_sequence function.
+        Either a scenes.json file or a radar_data.h5 file can be loaded. Actual loading is done by the load_sequence
+        function.
         :return: None
         """
         filename = QtWidgets.QFileDialog.getOpenFileName(self, 'Open Sequence',
-                                                         os.getcwd(), "Radar data files (*.json)",
+                                                         os.getcwd(), "Radar data files (*.json *.h5)",
                                                          options=QtWidgets.QFileDialog.DontUseNativeDialog)
         filename = filename[0]
         if filename != "" and filename is not None:
             self.load_sequence(filename)
 
-    def on_sequence_loading_finished(self, sequence, timestamps):
-        QtWidgets.QApplication.restoreOverrideCursor()
+    def on_sequence_opened(self, generation, sequence):
+        """
+        Callback function which is called as soon as the file of a new sequence is open, before any frame is indexed.
+        Replaces the current sequence and resets the timeline.
+        :param generation: Generation of the load which emitted the signal
+        :param sequence: The sequence which is being loaded
+        :return: None
+        """
+        if generation != self.load_generation:
+            # The superseded load hands its sequence over like any other, it is not used
+            if isinstance(sequence, SequenceData):
+                sequence.close()
+            return
+        if self.frame_worker is not None:
+            # The processing thread must not read the old sequence anymore
+            self.frame_worker.cancel()
+        if isinstance(self.sequence, SequenceData):
+            self.sequence.close()
         self.sequence = sequence
-        self.timestamps = timestamps
+        self.frame_index = FrameIndex.empty()
+        self.timestamps = self.frame_index.timestamps
+        self.sequence_loaded = False
+        self.sequence_columns = None
+        self.resident_key = None
+        self.requested_resident_key = None
+        self.update_frame_source()
+        self.process_prefetcher.reset()
+        self.frame_pipeline.invalidate()
+        self.render_scheduler.cancel()
+        self.render_scheduler.reset_statistics()
+        self.playback.pause()
+        self.playback.set_timestamps(self.timestamps)
         # self.color_by_list.setCurrentIndex(6)
-        self.timeline_slider.setMaximum(len(self.timestamps) - 1)
-        self.timeline_spinbox.setMaximum(len(self.timestamps) - 1)
         self.timeline_slider.setMinimum(0)
+        self.timeline_slider.setMaximum(0)
+        self.timeline_spinbox.setMaximum(0)
         self.timeline_slider.setValue(0)
         # self.generate_colors_true_tracks()
         self.setWindowTitle("Radar Data Viewer - {}".format(self.sequence.sequence_name))
-        self.plot_frames()
 
-    def on_sequence_loading_failed(self):
+    def on_frames_indexed(self, generation, frame_batch):
+        """
+        Callback function for every batch of frames the loader has finished. The timeline grows with every batch.
+        The first frame is plotted as soon as the first batch arrives.
+        :param generation: Generation of the load which emitted the signal
+        :param frame_batch: FrameIndex holding the new frames
+        :return: None
+        """
+        if generation != self.load_generation:
+            return
+        first_batch = len(self.frame_index) == 0
+        self.frame_index.extend(frame_batch)
+        self.timestamps = self.frame_index.timestamps
+        self.update_frame_source()
+        self.playback.set_timestamps(self.timestamps)
+        self.timeline_slider.setMaximum(len(self.timestamps) - 1)
+        self.timeline_spinbox.setMaximum(len(self.timestamps) - 1)
+        if first_batch and len(self.timestamps) > 0:
+            self.restore_cursor()
+            self.plot_frames()
+
+    def on_sequence_loading_finished(self, generation, sequence, frame_index):
+        if generation != self.load_generation:
+            # The superseded load completed before it noticed the cancellation. Its sequence was handed over with
+            # sequence_opened already and is closed by on_sequence_opened.
+            return
+        self.restore_cursor()
+        self.timeline_slider.setMaximum(len(self.timestamps) - 1)
+        self.timeline_spinbox.setMaximum(len(self.timestamps) - 1)
+        self.sequence_loaded = True
+        if self.settings.gpu_resident_sequence:
+            self.plot_frames()
+
+    def on_sequence_preprocessed(self, generation, columns, columns_dir):
+        """
+        Callback function which is called when the whole sequence was converted to sequence coordinates. From now on,
+        frames are only sliced out of these columns. If worker processes are enabled and the columns are stored in the
+        sequence cache, the frames are built by the worker processes into a shared memory arena.
+        :param generation: Generation of the load which emitted the signal
+        :param columns: Dictionary of columns returned by preprocess_sequence
+        :param columns_dir: Folder of the columns, None if it was temporary
+        :return: None
+        """
+        if generation != self.load_generation:
+            return
+        if self.frame_worker is not None:
+            self.frame_worker.cancel()
+            self.requested_resident_key = None
+        self.sequence_columns = columns
+        self.update_frame_source()
+        if self.settings.frame_worker_processes > 0 and columns_dir is not None and \
+                not self.process_prefetcher.reset(columns_dir, self.frame_index, self.settings.sweep_window_lookback):
+            warnings.warn(f"The columns in {columns_dir} do not match the sequence, frames are built without worker "
+                          "processes")
+        self.frame_pipeline.invalidate()
+        self.request_plot()
+
+    def on_loading_progress(self, generation, progress):
+        """
+        Callback function for progress reports of the loader. Shows the progress of the current phase and the read
+        throughput in the status bar. The bar is hidden again once the phase is complete.
+        :param generation: Generation of the load which emitted the signal
+        :param progress: LoadProgress of the current phase
+        :return: None
+        """
+        if generation != self.load_generation:
+            return
+        self.load_progress_bar.setValue(int(progress.fraction * self.load_progress_bar.maximum()))
+        self.load_progress_bar.setFormat("{} {:.0f}%  {:.1f} MB/s  {} frames".format(
+            progress.phase, 100 * progress.fraction, progress.throughput / 1e6, progress.frames_indexed))
+        self.load_progress_bar.setVisible(progress.fraction < 1.0)
+
+    @staticmethod
+    def restore_cursor():
+        if QtWidgets.QApplication.overrideCursor() is not None:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+    def on_sequence_loading_failed(self, generation):
         """
         Callback function for the case that loading of a sequence failed.
         Resets the cursor and prints and error box.
+        :param generation: Generation of the load which emitted the signal
         :return:
         """
-        QtWidgets.QApplication.restoreOverrideCursor()
+        if generation != self.load_generation:
+            return
+        self.restore_cursor()
+        self.load_progress_bar.setVisible(False)
         msg_box = QtWidgets.QMessageBox()
         msg_box.setIcon(QtWidgets.QMessageBox.Critical)
         msg_box.setText("Unable to open file.")
@@ -304,87 +539,48 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def load_sequence(self, path: str):
         """
-        Loads the contents of a json file which describes a measurement sequence.
-        A timeline is created so that all scenes are in the correct order.
-        The slider is initialized to the correct values and the first frame is plotted.
-        :param path: full path to the json file.
+        Loads the contents of a json file which describes a measurement sequence, or opens a radar_data.h5 file
+        directly.
+        A timeline is created so that all scenes are in the correct order. It grows while the sequence is loaded and
+        the first frame is plotted as soon as it is available.
+        :param path: full path to the json or h5 file.
         :return: None
         """
-        if not path.endswith(".json") or not os.path.exists(path):
+        if not path.endswith((".json", ".h5")) or not os.path.exists(path):
             return
 
-        self.loader_worker = LoadSequenceWorker(path)
+        # A new load supersedes all running loads
+        for worker, _ in self.running_loads.values():
+            worker.cancel()
+        self.load_generation += 1
+        generation = self.load_generation
+
+        self.loader_worker = LoadSequenceWorker(path, self.settings, generation)
         self.thread = QtCore.QThread()
+        self.loader_worker.sequence_opened.connect(self.on_sequence_opened)
+        self.loader_worker.frames_indexed.connect(self.on_frames_indexed)
         self.loader_worker.loading_done.connect(self.on_sequence_loading_finished)
         self.loader_worker.loading_failed.connect(self.on_sequence_loading_failed)
+        self.loader_worker.progress.connect(self.on_loading_progress)
+        self.loader_worker.sequence_preprocessed.connect(self.on_sequence_preprocessed)
         self.loader_worker.moveToThread(self.thread)
         self.loader_worker.finished.connect(self.thread.quit)
         self.thread.started.connect(self.loader_worker.load)
+        # Keep worker and thread alive until the thread has finished, even if the load was superseded
+        self.running_loads[generation] = (self.loader_worker, self.thread)
+        self.thread.finished.connect(lambda: self.running_loads.pop(generation, None))
         self.thread.start()
-        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        if QtWidgets.QApplication.overrideCursor() is None:
+            QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
 
-    def get_current_scene(self):
+    def update_frame_source(self):
         """
-        Retrieves the scenes which should be displayed according to the current values of the time slider and the
-        spinboxes for the past and future frames.
-        Values of the spinboxes are retrieved and from the list of timestamps, the corresponding times are obtained.
-        :return: The current frame (type Scene) and a list of other frames (type Scene) which should be displayed.
+        Replaces the FrameSource snapshot after the sequence, the frame index or the columns changed. Jobs of the
+        processing thread carry the snapshot, so the thread never reads the attributes of the main window.
+        :return: None
         """
-        cur_idx = self.timeline_slider.value()
-        cur_timestamp = self.timestamps[cur_idx]
-        current_scene = self.sequence.get_scene(cur_timestamp)
-
-        return current_scene
-
-    def process_radar_data(self, current_scene):
-        radar_data = current_scene.radar_data
-        odometry_data = current_scene.odometry_data
-        # TODO: Compute x_seq, y_seq, and yaw_seq ourselves from odometry data vx and yaw_rate
-        # TODO: Use previous odometry and add delta
-
-        if self.scene_buffer:
-            for other_scene in self.scene_buffer:
-                x_cc, y_cc = \
-                    transform_detections_sequence_to_car(other_scene["x_seq"], other_scene["y_seq"], odometry_data)
-                other_scene["x_cc"] = x_cc
-                other_scene["y_cc"] = y_cc
-
-        # Inputs:
-        # Range, Azimuth Angle, Doppler Velocity, RCS/SNR, Sensor ID
-        current_scenes = self.scene_buffer
-        sensors_in_scene = np.unique(radar_data["sensor_id"])
-        for unique_sensor_id in sensors_in_scene:
-            # Clear any scenes with the same sensor ID as current one
-            new_scene_buffer = []
-            for i in current_scenes:
-                if not i['sensor_id'][0] in radar_data['sensor_id']:
-                    new_scene_buffer.append(i)
-            current_scenes = new_scene_buffer
-
-            sensor_radar_data = np.take(radar_data, np.argwhere(radar_data["sensor_id"] == unique_sensor_id).flatten())
-            sensor_id = sensor_radar_data["sensor_id"]
-            range_sc = sensor_radar_data["range_sc"]
-            azimuth_sc = sensor_radar_data["azimuth_sc"]
-
-            sensor_x = np.array([get_mounting(s_id)["x"] for s_id in sensor_id])
-            sensor_y = np.array([get_mounting(s_id)["y"] for s_id in sensor_id])
-            sensor_yaw = np.array([get_mounting(s_id)["yaw"] for s_id in sensor_id])
-
-            x_cc = range_sc * np.cos(azimuth_sc + sensor_yaw) + sensor_x
-            y_cc = range_sc * np.sin(azimuth_sc + sensor_yaw) + sensor_y
-
-            x_seq, y_seq = transform_detections_car_to_sequence(x_cc, y_cc, odometry_data)
-
-            sensor_radar_data['x_cc'] = x_cc
-            sensor_radar_data['y_cc'] = y_cc
-            sensor_radar_data['x_seq'] = x_seq
-            sensor_radar_data['y_seq'] = y_seq
-
-            current_scenes.append(sensor_radar_data)
-
-        self.scene_buffer = current_scenes
-
-        return np.hstack(self.scene_buffer)
+        self.frame_source = FrameSource.create(self.sequence, self.frame_index, self.settings.sweep_window_lookback,
+                                               self.sequence_columns)
 
     def update_status_bar(self, frame_idx, frame_timestamp, window_size):
         """
@@ -401,8 +597,11 @@ class MainWindow(QtWidgets.QMainWindow):
             current_time = (frame_timestamp - self.timestamps[0]) / 10 ** 6
 
         self.status_label.setText \
-            ("Frame {}/{}     Current Timestamp: {}     Time Window Size: {:.1f}ms     Time: {:.2f}s".format(
-            frame_idx, len(self.timestamps) - 1, frame_timestamp, window_size, current_time))
+            ("Frame {}/{}     Current Timestamp: {}     Time Window Size: {:.1f}ms     Time: {:.2f}s"
+             "     Frame Cache: {:.0f}% hits, {:.0f}MB     Skipped Frames: {}".format(
+            frame_idx, len(self.timestamps) - 1, frame_timestamp, window_size, current_time,
+            100 * self.geometry_builder.frame_cache.hit_rate, self.geometry_builder.frame_cache.nbytes / 1024 ** 2,
+            self.render_scheduler.skipped_frames))
 
     def trafo_radar_data_world_to_car(self, scene, other_scenes) -> np.ndarray:
         """
@@ -438,11 +637,6 @@ class MainWindow(QtWidgets.QMainWindow):
         if len(self.timestamps) == 0 or cur_idx >= len(self.timestamps):
             return
         cur_timestamp = self.timestamps[cur_idx]
-        current_scene = self.get_current_scene()
-        radar_data = self.process_radar_data(current_scene)
-
-        self.update_status_bar(cur_idx, cur_timestamp,
-                               (np.max(radar_data["timestamp"] - np.min(radar_data["timestamp"])) / 10 ** 3))
 
         # DOPPLER ARROWS
         if self.doppler_arrows_cb.isChecked():
@@ -451,5 +645,165 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             self.settings.draw_doppler_arrows = False
 
+        color_by = self.color_by_list.currentText()
+        if self.settings.gpu_resident_sequence and self.sequence_loaded and \
+                self.plot_resident_frame(cur_idx, cur_timestamp, color_by):
+            return
+
+        # Colormap and arrow scale are uniforms, the pipeline only repeats the stages whose inputs changed
+        self.canvas.set_color_by(color_by)
+        self.canvas.set_doppler_scale(self.settings.doppler_arrow_scale)
+        if self.process_prefetcher.active:
+            if self.plot_prefetched_frame(cur_idx, color_by, dataclasses.replace(self.settings)):
+                return
+        if self.frame_worker is not None:
+            # The frame is uploaded by on_frame_processed as soon as the processing thread is done
+            self.frame_worker.request(FrameJob(cur_idx, self.canvas.pixel_scale, color_by,
+                                               dataclasses.replace(self.settings), self.frame_source))
+            return
+        stages = self.frame_pipeline.update((cur_idx, self.canvas.pixel_scale),
+                                            functools.partial(self.geometry_builder.geometry, self.frame_source,
+                                                              cur_idx, self.canvas.pixel_scale),
+                                            color_by, self.settings)
+        self.show_frame(cur_idx, self.frame_pipeline.vertices, stages)
+
+    def on_frame_processed(self):
+        """
+        Callback function of the processing thread. Uploads the latest frame of the vertex handoff.
+        :return: None
+        """
+        slot = self.frame_worker.handoff.take()
+        if slot is None:
+            return
+        try:
+            if self.canvas.resident_sequence is None:
+                self.show_frame(slot.frame_idx, slot.vertices, slot.stages)
+        finally:
+            self.frame_worker.handoff.release()
+
+    def show_frame(self, frame_idx: int, vertices: FrameVertices, stages: Stage):
+        """
+        Uploads the buffers of a frame which changed and moves the car to its pose.
+        :param frame_idx: Index of the frame
+        :param vertices: Output of the frame pipeline
+        :param stages: Stages of the pipeline which ran since the last upload
+        :return: None
+        """
+        self.update_status_bar(frame_idx, self.timestamps[frame_idx], vertices.window_size)
+        self.playback.frame_shown(frame_idx)
+
         # DRAW CANVAS
-        self.canvas.update_scene(radar_data, color_by=self.color_by_list.currentText())
+        current_odometry = self.sequence.odometry_data[self.frame_index.odometry_indices[frame_idx]]
+        self.canvas.set_seq_to_car(trafo_matrix_seq_to_car(current_odometry))
+        if stages:
+            self.canvas.upload_vertices(vertices,
+                                        upload_detections=bool(stages & (Stage.GEOMETRY | Stage.COLOR)),
+                                        upload_lines=bool(stages & (Stage.GEOMETRY | Stage.COLOR | Stage.ARROWS)))
+
+    def plot_prefetched_frame(self, frame_idx: int, color_by: str, settings: Settings) -> bool:
+        """
+        Plots a frame built by the worker processes. The worker processes run all stages of the frame pipeline, the
+        vertex arrays are uploaded straight from the slot of the shared memory arena. A frame which is not ready yet is
+        plotted as soon as it has been built, until then the previous frame stays on screen.
+        :param frame_idx: Index of the frame
+        :param color_by: Value of a ColorOpts entry
+        :param settings: Copy of the settings. The tasks are pickled later on, the settings must not change until then.
+        :return: False if the worker processes failed and the frame has to be plotted without them
+        """
+        pixel_scale = self.canvas.pixel_scale
+        vertices = self.process_prefetcher.get(frame_idx, pixel_scale, color_by, settings)
+        if not self.process_prefetcher.active:
+            # The canvas holds a frame which the frame pipeline does not know
+            if self.frame_worker is not None:
+                self.frame_worker.invalidate()
+            else:
+                self.frame_pipeline.invalidate()
+            return False
+        self.process_prefetcher.prefetch_around(frame_idx, self.settings.prefetch_frames, len(self.frame_index),
+                                                pixel_scale, color_by, settings)
+        if vertices is not None:
+            self.show_frame(frame_idx, vertices, Stage.ALL)
+        return True
+
+    def plot_resident_frame(self, frame_idx: int, frame_timestamp: int, color_by: str) -> bool:
+        """
+        Plots a frame while the whole sequence is resident on the GPU. The vertex arrays of the sequence are only
+        built and uploaded when the coloring, the Doppler arrows or the pixel scale change. Moving to another frame
+        only selects other vertex ranges and updates the car pose.
+        With the processing thread, the vertex arrays are built there and uploaded by on_sequence_vertices_ready.
+        Until then, frames are plotted one by one.
+        :param frame_idx: Index of the frame
+        :param frame_timestamp: Timestamp of the frame
+        :param color_by: Value of a ColorOpts entry
+        :return: False if the resident vertex arrays are not ready yet and the frame was not plotted
+        """
+        self.canvas.set_color_by(color_by)
+        self.canvas.set_doppler_scale(self.settings.doppler_arrow_scale)
+        job = SequenceJob((self.load_generation, self.canvas.pixel_scale,
+                           None if self.settings.shader_colormaps else color_by, self.settings.draw_doppler_arrows,
+                           self.settings.doppler_arrow_heads, self.settings.dark_mode),
+                          self.canvas.pixel_scale, color_by, dataclasses.replace(self.settings), self.frame_source)
+        if self.canvas.resident_sequence is None or job.key != self.resident_key:
+            if self.frame_worker is None:
+                job.source = job.source.with_columns()
+                self.keep_sequence_columns(job.source)
+                self.canvas.upload_sequence(self.sequence_vertices(job))
+                self.resident_key = job.key
+            else:
+                if job.key != self.requested_resident_key:
+                    self.requested_resident_key = job.key
+                    self.frame_worker.request_sequence(job)
+                if self.canvas.resident_sequence is not None:
+                    # The frames are uploaded one by one again, all of their buffers have to be filled
+                    self.canvas.release_sequence()
+                    self.frame_worker.invalidate()
+                return False
+
+        vertices = self.canvas.resident_sequence
+        lookback = self.settings.sweep_window_lookback
+        self.update_status_bar(frame_idx, frame_timestamp, vertices.window_size(frame_idx, lookback))
+
+        current_odometry = self.sequence.odometry_data[self.frame_index.odometry_indices[frame_idx]]
+        self.canvas.set_seq_to_car(trafo_matrix_seq_to_car(current_odometry))
+        self.canvas.show_ranges(vertices.detection_ranges(frame_idx, lookback))
+        self.playback.frame_shown(frame_idx)
+        return True
+
+    def on_sequence_vertices_ready(self, key, vertices: SequenceVertices, source: FrameSource):
+        """
+        Callback function of the processing thread. Uploads the vertex arrays of the whole sequence, unless other
+        options were requested in the meantime.
+        :param key: Options the vertex arrays were built with, see plot_resident_frame
+        :param vertices: Vertex arrays of the sequence
+        :param source: Snapshot the vertex arrays were built from, with the columns of the sequence
+        :return: None
+        """
+        self.keep_sequence_columns(source)
+        if key != self.requested_resident_key:
+            return
+        self.requested_resident_key = None
+        self.canvas.upload_sequence(vertices)
+        self.resident_key = key
+        self.request_plot()
+
+    def keep_sequence_columns(self, source: FrameSource):
+        """
+        Keeps the columns of the current sequence which were built for the GPU resident mode, so the sequence is only
+        converted once. Frames are sliced out of the columns from now on.
+        :param source: Snapshot with columns
+        :return: None
+        """
+        if source.sequence is self.sequence and self.sequence_columns is None:
+            self.sequence_columns = source.columns
+            self.update_frame_source()
+
+    @staticmethod
+    def sequence_vertices(job: SequenceJob) -> SequenceVertices:
+        """
+        Builds the vertex arrays of the whole sequence for the GPU resident mode. Runs on the processing thread if it
+        is enabled.
+        :param job: Options to build the vertex arrays with, its source must have columns
+        :return: SequenceVertices
+        """
+        return build_sequence_vertices(job.source.columns, job.source.frame_index, job.color_by, job.settings,
+                                       job.pixel_scale)
@@ -3,6 +3,8 @@
 """Settings dataclass. Holds settings for the visualization tool during runtime.
 """
 
+import os
+
 from dataclasses import dataclass
 
 @dataclass
@@ -16,3 +18,30 @@ class Settings:
     grid_circle_color: tuple = (0.15, 0.15, 0.18, 1.0)
     doppler_arrow_scale: float = 0.2
     draw_doppler_arrows: bool = True
+    doppler_arrow_heads: bool = False
+    use_sequence_cache: bool = True
+    # Caches of all sequences, one sub folder per sequence. A relative folder is placed next to each sequence instead.
+    sequence_cache_folder: str = os.path.join(os.path.expanduser("~"), ".vispy_radar_scenes", "sequence_cache")
+    lazy_h5_loading: bool = False
+    h5_read_chunk_rows: int = 1 << 16
+    h5_chunk_cache_bytes: int = 16 * 1024 ** 2
+    load_log_file: str = os.path.join(os.path.expanduser("~"), ".vispy_radar_scenes", "load_performance.log")
+    sweep_window_lookback: int = 16
+    prefetch_frames: int = 8
+    prefetch_workers: int = 2
+    frame_cache_bytes: int = 256 * 1024 ** 2
+    gpu_resident_sequence: bool = False
+    shader_colormaps: bool = True
+    vertex_buffer_initial_size: int = 8192
+    vertex_buffer_shrink_after: int = 300
+    # Maximum number of frames rendered per second while scrubbing, 0 uses the refresh rate of the screen
+    render_refresh_rate: float = 0.0
+    playback_speed: float = 1.0
+    # Build the vertex arrays on a processing thread, the GUI thread only uploads them
+    processing_thread: bool = True
+    # Convert the whole sequence to sequence coordinates in a process pool after loading, e.g. for batch review
+    preprocess_sequence: bool = False
+    preprocess_workers: int = 0
+    preprocess_folder: str = "preprocessed"
+    # Worker processes which build frames into a shared memory arena, needs preprocessed columns in the sequence cache
+    frame_worker_processes: int = 0
@@ -1,17 +1,6 @@
 import numpy as np
 
 
-def batch_transform_3d_vector(trafo_matrix: np.ndarray, vec: np.ndarray) -> np.ndarray:
-    """
-    Applies a 3x3 transformation matrix to every (1,3) vector contained in vec.
-    Vec has shape (n_vec, 3)
-    :param trafo_matrix: numpy array with shape (3,3)
-    :param vec: numpy array with shape (n_vec, 3)
-    :return: Transformed vector. Numpy array of shape (n_vec, 3)
-    """
-    return np.einsum('ij,kj->ki', trafo_matrix, vec)
-
-
 def trafo_matrix_seq_to_car(odometry: np.ndarray) -> np.ndarray:
     """
     Computes the transformation matrix from sequence coordinates to car coordiantes, given an odometry entry.
@@ -40,12 +29,8 @@ def transform_detections_sequence_to_car(x_seq: np.ndarray, y_seq: np.ndarray, o
     :return: Two 1D numpy arrays, both of shape (n_detections,). The first array contains the x-coordinate and the
     second array contains the y-coordinate of the detections in car coordinates.
     """
-    trafo_matrix = trafo_matrix_seq_to_car(odometry)
-    v = np.ones((len(x_seq), 3))
-    v[:, 0] = x_seq
-    v[:, 1] = y_seq
-    res = batch_transform_3d_vector(trafo_matrix, v)
-    return res[:, 0], res[:, 1]
+    return transform_detections_sequence_to_car_batch(np.asarray(x_seq, np.float64), np.asarray(y_seq, np.float64),
+                                                      odometry)
 
 
 def transform_detections_car_to_sequence(x_cc: np.ndarray, y_cc: np.ndarray, odometry: np.ndarray):
@@ -59,9 +44,81 @@ def transform_detections_car_to_sequence(x_cc: np.ndarray, y_cc: np.ndarray, odo
     :return: Two 1D numpy arrays, both of shape (n_detections,). The first array contains the x-coordinate and the
     second array contains the y-coordinate of the detections in sequence coordinates.
     """
-    trafo_matrix = np.linalg.inv(trafo_matrix_seq_to_car(odometry))
-    v = np.ones((len(x_cc), 3))
-    v[:, 0] = x_cc
-    v[:, 1] = y_cc
-    res = batch_transform_3d_vector(trafo_matrix, v)
-    return res[:, 0], res[:, 1]
\ No newline at end of file
+    return transform_detections_car_to_sequence_batch(np.asarray(x_cc, np.float64), np.asarray(y_cc, np.float64),
+                                                      odometry)
+
+
+def transform_detections_sequence_to_car_batch(x_seq: np.ndarray, y_seq: np.ndarray, odometry: np.ndarray,
+                                               pose_indices: np.ndarray = None, out_x: np.ndarray = None,
+                                               out_y: np.ndarray = None):
+    """
+    Transforms the detections of many frames from sequence coordinates to the car coordinates of their frame in one
+    vectorized call. The rigid transform is evaluated in closed form, no matrices are built.
+    :param x_seq: Shape (n_detections,). Contains the x-coordinate of the detections in the sequence coord. system.
+    :param y_seq: Shape (n_detections,). Contains the y-coordinate of the detections in the sequence coord. system.
+    :param odometry: A single odometry entry or an array of n_poses entries containing at least the fields "x_seq",
+    "y_seq" and "yaw_seq"
+    :param pose_indices: Shape (n_detections,). Index of the odometry entry of every detection. If None, odometry is a
+    single entry or has one entry per detection.
+    :param out_x: Optional array of shape (n_detections,) for the x-coordinates. Must not overlap the inputs.
+    :param out_y: Optional array of shape (n_detections,) for the y-coordinates. Must not overlap the inputs.
+    :return: Two 1D numpy arrays with the x- and y-coordinates in car coordinates, out_x and out_y if they were given.
+    The computation is done in the dtype of out_x, or of the inputs if no output is given, so float32 stays float32.
+    """
+    dtype = _compute_dtype(out_x, x_seq, y_seq)
+    c, s, x_car, y_car = _pose_terms(odometry, dtype, pose_indices)
+    dx = np.subtract(x_seq, x_car, dtype=dtype)
+    dy = np.subtract(y_seq, y_car, dtype=dtype)
+    out_x = np.multiply(c, dx, out=out_x, dtype=dtype)
+    out_x += s * dy
+    out_y = np.multiply(c, dy, out=out_y, dtype=dtype)
+    dx *= s
+    out_y -= dx
+    return out_x, out_y
+
+
+def transform_detections_car_to_sequence_batch(x_cc: np.ndarray, y_cc: np.ndarray, odometry: np.ndarray,
+                                               pose_indices: np.ndarray = None, out_x: np.ndarray = None,
+                                               out_y: np.ndarray = None):
+    """
+    Transforms the detections of many frames from the car coordinates of their frame to sequence coordinates in one
+    vectorized call. Uses the closed-form inverse of the rigid transform instead of inverting a matrix.
+    :param x_cc: Shape (n_detections,). Contains the x-coordinate of the detections in the car coord. system.
+    :param y_cc: Shape (n_detections,). Contains the y-coordinate of the detections in the car coord. system.
+    :param odometry: A single odometry entry or an array of n_poses entries containing at least the fields "x_seq",
+    "y_seq" and "yaw_seq"
+    :param pose_indices: Shape (n_detections,). Index of the odometry entry of every detection. If None, odometry is a
+    single entry or has one entry per detection.
+    :param out_x: Optional array of shape (n_detections,) for the x-coordinates. Must not overlap the inputs.
+    :param out_y: Optional array of shape (n_detections,) for the y-coordinates. Must not overlap the inputs.
+    :return: Two 1D numpy arrays with the x- and y-coordinates in sequence coordinates, out_x and out_y if they were
+    given. The computation is done in the dtype of out_x, or of the inputs if no output is given.
+    """
+    dtype = _compute_dtype(out_x, x_cc, y_cc)
+    c, s, x_car, y_car = _pose_terms(odometry, dtype, pose_indices)
+    out_x = np.multiply(c, x_cc, out=out_x, dtype=dtype)
+    out_x -= s * y_cc
+    out_x += x_car
+    out_y = np.multiply(s, x_cc, out=out_y, dtype=dtype)
+    out_y += c * y_cc
+    out_y += y_car
+    return out_x, out_y
+
+
+def _compute_dtype(out: np.ndarray, *inputs: np.ndarray) -> np.dtype:
+    if out is not None:
+        return out.dtype
+    dtype = np.result_type(*inputs)
+    return dtype if np.issubdtype(dtype, np.floating) else np.dtype(np.float64)
+
+
+def _pose_terms(odometry: np.ndarray, dtype: np.dtype, pose_indices: np.ndarray = None):
+    """
+    :return: cos(yaw), sin(yaw), x and y of the car in dtype, gathered per detection if pose_indices is given. The
+    trigonometric functions are evaluated once per pose, not per detection.
+    """
+    yaw = np.asarray(odometry["yaw_seq"], dtype)
+    terms = (np.cos(yaw), np.sin(yaw), np.asarray(odometry["x_seq"], dtype), np.asarray(odometry["y_seq"], dtype))
+    if pose_indices is None:
+        return terms
+    return tuple(values[pose_indices] for values in terms)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Lookup table of the sensor mounting positions, indexed by sensor id
+"""
+
+import numpy as np
+
+from radar_scenes.sensors import get_mounting
+
+
+SENSOR_IDS = (1, 2, 3, 4)
+
+
+class MountingTable:
+    """
+    Mounting positions and yaw angles of all radar sensors as arrays indexed by sensor id. Looking up the mounting of
+    every detection is a single fancy indexing operation instead of one get_mounting call per detection.
+    Entries of unknown sensor ids are NaN.
+    """
+
+    def __init__(self, sensor_ids=SENSOR_IDS, json_path: str = None):
+        """
+        :param sensor_ids: Ids of all sensors
+        :param json_path: Path to a sensor.json file. If not defined, the default mounting positions are used.
+        """
+        size = max(sensor_ids) + 1
+        self.x = np.full(size, np.nan)
+        self.y = np.full(size, np.nan)
+        self.yaw = np.full(size, np.nan)
+        for sensor_id in sensor_ids:
+            mounting = get_mounting(sensor_id, json_path)
+            self.x[sensor_id] = mounting["x"]
+            self.y[sensor_id] = mounting["y"]
+            self.yaw[sensor_id] = mounting["yaw"]
+
+    def lookup(self, sensor_id: np.ndarray):
+        """
+        :param sensor_id: Shape (n_detections,). Sensor id of every detection.
+        :return: Three arrays of shape (n_detections,): x and y position and yaw angle of the sensor in car
+        coordinates.
+        """
+        return self.x[sensor_id], self.y[sensor_id], self.yaw[sensor_id]
+
+
+default_mounting_table = MountingTable()
@@ -5,6 +5,8 @@
 
 import os
 import enum
+import numpy as np
+import logging
 
 from pkg_resources import resource_filename
 from PyQt5 import QtCore, QtWidgets
@@ -64,6 +66,71 @@ class Colors:
         h = hex_string.lstrip('#').upper()
         return (tuple(int(h[i:i + 2], 16) / 255.0 for i in (0, 2, 4))) + (1,)
 
+    # Fill color of sensor ids without an entry in sensor_id_to_color
+    unknown_sensor_color = (0.95, 0.95, 1, 1)
+    _sensor_id_lut = None
+
+    @staticmethod
+    def hex_to_rgba_array(hex_strings) -> np.ndarray:
+        """
+        Converts several hex color strings at once.
+        :param hex_strings: Iterable of hex strings like "#f02b2b"
+        :return: float32 array with shape (n, 4)
+        """
+        codes = np.array([int(h.lstrip('#'), 16) for h in hex_strings], dtype=np.uint32)
+        rgba = np.ones((len(codes), 4), np.float32)
+        for channel, shift in enumerate((16, 8, 0)):
+            rgba[:, channel] = ((codes >> shift) & 0xff) / 255.0
+        return rgba
+
+    @staticmethod
+    def color_gradient_array(from_color: tuple, to_color: tuple, vals: np.ndarray, out: np.ndarray = None) \
+            -> np.ndarray:
+        """
+        Array version of color_gradient: interpolates between two colors for every value in vals. The colors are
+        computed in float64 like color_gradient and only rounded once, when they are stored as float32.
+        :param from_color: Color for the value 0
+        :param to_color: Color for the value 1
+        :param vals: Array with shape (n,)
+        :param out: Optional array with shape (n, 4) the colors are written to, e.g. a color column of a vertex array
+        :return: Array with shape (n, 4), out if it was given
+        """
+        from_color = np.asarray(from_color, np.float64)
+        to_color = np.asarray(to_color, np.float64)
+        colors = np.multiply(np.asarray(vals, np.float64)[:, None], to_color - from_color)
+        colors += from_color
+        if out is None:
+            return colors.astype(np.float32)
+        out[:] = colors
+        return out
+
+    @classmethod
+    def sensor_id_lut(cls) -> np.ndarray:
+        """
+        :return: Lookup table with shape (256, 4) which maps every sensor id to its color
+        """
+        if cls._sensor_id_lut is None:
+            lut = np.empty((256, 4), np.float32)
+            lut[:] = cls.unknown_sensor_color
+            lut[list(cls.sensor_id_to_color.keys())] = cls.hex_to_rgba_array(cls.sensor_id_to_color.values())
+            cls._sensor_id_lut = lut
+        return cls._sensor_id_lut
+
+    @classmethod
+    def sensor_id_colors(cls, sensor_ids: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Looks up the colors of an array of sensor ids.
+        :param sensor_ids: Integer array with shape (n,)
+        :param out: Optional array with shape (n, 4) the colors are written to
+        :return: Array with shape (n, 4), out if it was given
+        """
+        colors = cls.sensor_id_lut()[np.asarray(sensor_ids, np.uint8)]
+        if out is None:
+            return colors
+        out[:] = colors
+        return out
+
+
 def set_stylesheet(path):
     """
     Set the stylesheet to use the desired path in the Qt resource
@@ -101,6 +168,30 @@ def load_resource_from_package(sub_module, file) -> str:
     return data
 
 
+def get_file_logger(name: str, log_file: str) -> logging.Logger:
+    """
+    Returns a logger of this package which appends its records to log_file. The file handler is only added once.
+    :param name: Name of the logger, relative to the package
+    :param log_file: Full path to the log file. If empty, nothing is written to a file.
+    :return: The logger
+    """
+    logger = logging.getLogger(f'{package_module_name}.{name}')
+    logger.setLevel(logging.INFO)
+    if not log_file:
+        return logger
+
+    log_file = os.path.abspath(log_file)
+    if not any(isinstance(h, logging.FileHandler) and h.baseFilename == log_file for h in logger.handlers):
+        try:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            handler = logging.FileHandler(log_file)
+        except OSError:
+            return logger
+        handler.setFormatter(logging.Formatter("%(asctime)s\t%(message)s"))
+        logger.addHandler(handler)
+    return logger
+
+
 def load_shader(file) -> str:
     return load_resource_from_package('gl_objects.shaders', file)
 
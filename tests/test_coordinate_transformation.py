@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares the closed-form batched transforms with the transformation matrices they replaced
+"""
+
+import numpy as np
+
+from vispy_radar_scenes.transform.coordinate_transformation import trafo_matrix_seq_to_car, \
+    transform_detections_sequence_to_car_batch, transform_detections_car_to_sequence_batch
+
+ODOMETRY_DTYPE = np.dtype([("timestamp", np.uint64), ("x_seq", np.float64), ("y_seq", np.float64),
+                           ("yaw_seq", np.float64)])
+
+
+def random_poses(n: int) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    odometry = np.zeros(n, ODOMETRY_DTYPE)
+    odometry["x_seq"] = rng.uniform(-500, 500, n)
+    odometry["y_seq"] = rng.uniform(-500, 500, n)
+    odometry["yaw_seq"] = rng.uniform(-np.pi, np.pi, n)
+    return odometry
+
+
+def matrix_transform(trafo_matrix: np.ndarray, x: np.ndarray, y: np.ndarray):
+    vec = np.stack((x, y, np.ones_like(x)), axis=1)
+    result = np.einsum('ij,kj->ki', trafo_matrix, vec)
+    return result[:, 0], result[:, 1]
+
+
+def test_batched_transforms_match_matrices():
+    rng = np.random.default_rng(2)
+    odometry = random_poses(8)
+    pose_indices = rng.integers(0, len(odometry), 200)
+    x = rng.uniform(-100, 100, len(pose_indices))
+    y = rng.uniform(-100, 100, len(pose_indices))
+
+    x_cc, y_cc = transform_detections_sequence_to_car_batch(x, y, odometry, pose_indices)
+    x_seq, y_seq = transform_detections_car_to_sequence_batch(x, y, odometry, pose_indices)
+
+    for pose_idx, pose in enumerate(odometry):
+        rows = pose_indices == pose_idx
+        to_car = trafo_matrix_seq_to_car(pose)
+        expected_cc = matrix_transform(to_car, x[rows], y[rows])
+        expected_seq = matrix_transform(np.linalg.inv(to_car), x[rows], y[rows])
+        np.testing.assert_allclose(x_cc[rows], expected_cc[0], atol=1e-9)
+        np.testing.assert_allclose(y_cc[rows], expected_cc[1], atol=1e-9)
+        np.testing.assert_allclose(x_seq[rows], expected_seq[0], atol=1e-9)
+        np.testing.assert_allclose(y_seq[rows], expected_seq[1], atol=1e-9)
+
+
+def test_float32_outputs_are_written_in_place():
+    rng = np.random.default_rng(3)
+    pose = random_poses(1)[0]
+    x = rng.uniform(-100, 100, 50).astype(np.float32)
+    y = rng.uniform(-100, 100, 50).astype(np.float32)
+    out_x = np.empty_like(x)
+    out_y = np.empty_like(y)
+
+    result = transform_detections_car_to_sequence_batch(x, y, pose, out_x=out_x, out_y=out_y)
+
+    assert result[0] is out_x and result[1] is out_y
+    expected = matrix_transform(np.linalg.inv(trafo_matrix_seq_to_car(pose)), x.astype(np.float64),
+                                y.astype(np.float64))
+    np.testing.assert_allclose(out_x, expected[0], atol=1e-2)
+    np.testing.assert_allclose(out_y, expected[1], atol=1e-2)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of the LRU eviction and memory budget of FrameCache
+"""
+
+import numpy as np
+
+from vispy_radar_scenes.processing import FrameCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FrameCache(max_bytes=300)
+    for key in range(3):
+        cache.put(key, np.zeros(100, np.uint8))
+    assert cache.get(0) is not None
+
+    cache.put(3, np.zeros(100, np.uint8))
+
+    assert len(cache) == 3
+    assert cache.nbytes == 300
+    assert cache.get(1) is None
+    assert all(cache.get(key) is not None for key in [0, 2, 3])
+
+
+def test_budget_and_statistics():
+    cache = FrameCache(max_bytes=250)
+    cache.put("a", np.zeros(100, np.uint8))
+    cache.put("a", np.zeros(200, np.uint8))
+    assert len(cache) == 1 and cache.nbytes == 200
+
+    cache.put("b", np.zeros(100, np.uint8))
+    assert cache.get("a") is None
+    assert cache.nbytes == 100
+
+    cache.put("c", np.zeros(1000, np.uint8))
+    assert cache.get("c") is None
+    assert cache.get("b") is not None
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.hit_rate == 1 / 3
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0 and cache.hit_rate == 0.0
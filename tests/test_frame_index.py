@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of the incremental FrameIndexBuilder against the one pass FrameIndex.from_radar_data
+"""
+
+import numpy as np
+import pytest
+
+from vispy_radar_scenes.data import FrameIndex, FrameIndexBuilder
+
+
+def radar_columns(n_frames: int = 40):
+    rng = np.random.default_rng(0)
+    counts = rng.integers(1, 12, n_frames)
+    timestamps = np.repeat(1000 + np.arange(n_frames, dtype=np.uint64) * 17, counts)
+    sensor_ids = np.repeat((np.arange(n_frames) % 4 + 1).astype(np.uint8), counts)
+    odometry_timestamps = 1000 + np.arange(n_frames // 2 + 1, dtype=np.uint64) * 34
+    return timestamps, sensor_ids, odometry_timestamps
+
+
+def build_in_chunks(timestamps, sensor_ids, odometry_timestamps, chunk_size: int) -> FrameIndex:
+    builder = FrameIndexBuilder(odometry_timestamps)
+    frame_index = FrameIndex.empty()
+    for start in range(0, len(timestamps), chunk_size):
+        frame_index.extend(builder.add_chunk(timestamps[start:start + chunk_size],
+                                             sensor_ids[start:start + chunk_size]))
+    frame_index.extend(builder.finish())
+    return frame_index
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 10000])
+def test_chunk_size_does_not_change_index(chunk_size):
+    timestamps, sensor_ids, odometry_timestamps = radar_columns()
+    expected = FrameIndex.from_radar_data(timestamps, sensor_ids, odometry_timestamps)
+    frame_index = build_in_chunks(timestamps, sensor_ids, odometry_timestamps, chunk_size)
+
+    assert len(expected) == 40
+    for attr in ["timestamps", "starts", "ends", "odometry_indices", "sensor_ids"]:
+        np.testing.assert_array_equal(getattr(frame_index, attr), getattr(expected, attr))
+
+
+def test_frames_cover_all_rows_with_one_timestamp_each():
+    timestamps, sensor_ids, odometry_timestamps = radar_columns()
+    frame_index = build_in_chunks(timestamps, sensor_ids, odometry_timestamps, 5)
+
+    assert frame_index.starts[0] == 0
+    assert frame_index.ends[-1] == len(timestamps)
+    np.testing.assert_array_equal(frame_index.starts[1:], frame_index.ends[:-1])
+    for frame_idx in range(len(frame_index)):
+        start, end = frame_index.row_range(frame_idx)
+        assert np.all(timestamps[start:end] == frame_index.timestamps[frame_idx])
+
+
+def test_unordered_timestamps_raise():
+    builder = FrameIndexBuilder(np.array([0], dtype=np.uint64))
+    builder.add_chunk(np.array([5, 5, 3], dtype=np.uint64), np.array([1, 1, 2], dtype=np.uint8))
+    with pytest.raises(ValueError):
+        builder.finish()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares the vertex buffers of the processing thread with the synchronous FramePipeline path
+"""
+
+import time
+import dataclasses
+
+import numpy as np
+import pytest
+
+from vispy_radar_scenes.settings import Settings
+from vispy_radar_scenes.utils import ColorOpts
+from vispy_radar_scenes.gl_objects import GLRadarDetections, GLRadarDopplerLines
+from vispy_radar_scenes.processing import FramePipeline, Stage, VertexHandoff, build_geometry
+from vispy_radar_scenes.qt_objects import FrameProcessingWorker, FrameJob
+
+
+def radar_data(frame_idx: int) -> dict:
+    rng = np.random.default_rng(frame_idx)
+    n = int(rng.integers(1, 40))
+    return {
+        "timestamp": np.sort(rng.integers(0, 10 ** 5, n)).astype(np.uint64),
+        "sensor_id": rng.integers(1, 5, n).astype(np.uint8),
+        "rcs": rng.normal(0, 10, n).astype(np.float32),
+        "vr_compensated": rng.normal(0, 5, n).astype(np.float32),
+        "x_seq": rng.normal(0, 50, n).astype(np.float32),
+        "y_seq": rng.normal(0, 50, n).astype(np.float32),
+        "azimuth_seq": rng.uniform(-np.pi, np.pi, n).astype(np.float32),
+    }
+
+
+def frame_geometry(source, frame_idx: int, pixel_scale: float):
+    # The frames are synthetic, the jobs carry no FrameSource
+    return build_geometry(radar_data(frame_idx), pixel_scale)
+
+
+def jobs():
+    """Frame and option changes like the GUI sends them. The last frame is not requested before."""
+    settings = Settings()
+    color_by = ColorOpts.DOPPLER.value
+    steps = [
+        lambda s: None,
+        lambda s: setattr(s, "draw_doppler_arrows", False),
+        lambda s: setattr(s, "draw_doppler_arrows", True),
+        lambda s: setattr(s, "doppler_arrow_heads", True),
+        lambda s: setattr(s, "shader_colormaps", False),
+        lambda s: setattr(s, "dark_mode", False),
+        lambda s: setattr(s, "doppler_arrow_scale", 0.5),
+    ]
+    result = []
+    for i in range(60):
+        steps[i % len(steps)](settings)
+        if i % 5 == 0:
+            color_by = list(ColorOpts)[i % len(ColorOpts)].value
+        frame_idx = i // 3
+        result.append(FrameJob(frame_idx, 1.0, color_by, dataclasses.replace(settings), None))
+    result.append(FrameJob(1000, 1.0, color_by, dataclasses.replace(settings), None))
+    return result
+
+
+class Buffers:
+    """Emulates the vertex buffers of the canvas, see MainWindow.show_frame"""
+
+    def __init__(self):
+        self.detections = None
+        self.lines = None
+        self.frame_idx = None
+
+    def upload(self, frame_idx, vertices, stages: Stage):
+        self.frame_idx = frame_idx
+        if stages & (Stage.GEOMETRY | Stage.COLOR):
+            self.detections = vertices.detections.copy()
+        if stages & (Stage.GEOMETRY | Stage.COLOR | Stage.ARROWS):
+            self.lines = vertices.lines.copy()
+
+
+def synchronous_buffers(job_list) -> Buffers:
+    pipeline = FramePipeline()
+    buffers = Buffers()
+    for job in job_list:
+        stages = pipeline.update((job.frame_idx, job.pixel_scale),
+                                 lambda: frame_geometry(job.source, job.frame_idx, job.pixel_scale), job.color_by,
+                                 job.settings)
+        if stages:
+            buffers.upload(job.frame_idx, pipeline.vertices, stages)
+    return buffers
+
+
+def take_into(handoff: VertexHandoff, buffers: Buffers):
+    slot = handoff.take()
+    if slot is not None:
+        buffers.upload(slot.frame_idx, slot.vertices, slot.stages)
+        handoff.release()
+
+
+@pytest.mark.parametrize("take_every_frame", [True, False])
+def test_threaded_buffers_match_synchronous_pipeline(take_every_frame):
+    job_list = jobs()
+    handoff = VertexHandoff(GLRadarDetections.vertex_dtype, GLRadarDopplerLines.vertex_dtype, initial_size=4)
+    worker = FrameProcessingWorker(FramePipeline(), frame_geometry, handoff)
+    buffers = Buffers()
+    try:
+        for job in job_list:
+            worker.request(job)
+            if take_every_frame:
+                time.sleep(0.002)
+                take_into(handoff, buffers)
+        deadline = time.time() + 10
+        while buffers.frame_idx != job_list[-1].frame_idx and time.time() < deadline:
+            take_into(handoff, buffers)
+            time.sleep(0.001)
+    finally:
+        worker.shutdown()
+
+    expected = synchronous_buffers(job_list)
+    assert buffers.frame_idx == expected.frame_idx
+    np.testing.assert_array_equal(buffers.detections, expected.detections)
+    np.testing.assert_array_equal(buffers.lines, expected.lines)
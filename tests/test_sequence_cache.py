@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of the columnar sequence cache: round trip and detection of outdated caches
+"""
+
+import os
+import json
+
+import numpy as np
+import pytest
+
+from vispy_radar_scenes.data import FrameIndex, SequenceData, write_sequence_cache, load_sequence_cache, \
+    sequence_cache_dir
+
+RADAR_DTYPE = np.dtype([("timestamp", np.uint64), ("sensor_id", np.uint8), ("range_sc", np.float32),
+                        ("uuid", "S32")])
+ODOMETRY_DTYPE = np.dtype([("timestamp", np.uint64), ("x_seq", np.float32), ("y_seq", np.float32),
+                           ("yaw_seq", np.float32)])
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    sequence_dir = tmp_path / "sequence_1"
+    sequence_dir.mkdir()
+    (sequence_dir / "radar_data.h5").write_bytes(b"radar data")
+    (sequence_dir / "scenes.json").write_text("{}")
+    return str(sequence_dir / "radar_data.h5")
+
+
+def make_sequence():
+    radar_data = np.zeros(10, RADAR_DTYPE)
+    radar_data["timestamp"] = np.repeat(np.array([100, 117, 134], dtype=np.uint64), [3, 5, 2])
+    radar_data["sensor_id"] = np.repeat(np.array([1, 2, 3], dtype=np.uint8), [3, 5, 2])
+    radar_data["range_sc"] = np.linspace(1, 10, 10)
+    radar_data["uuid"] = [f"id{i}".encode() for i in range(10)]
+    odometry_data = np.zeros(2, ODOMETRY_DTYPE)
+    odometry_data["timestamp"] = [100, 134]
+    odometry_data["x_seq"] = [0.0, 1.5]
+    frame_index = FrameIndex.from_radar_data(radar_data["timestamp"], radar_data["sensor_id"],
+                                             odometry_data["timestamp"])
+    return SequenceData("sequence_1", radar_data, odometry_data), frame_index
+
+
+def test_round_trip(tmp_path, source_file):
+    sequence, frame_index = make_sequence()
+    cache_dir = str(tmp_path / "cache")
+    write_sequence_cache(cache_dir, source_file, sequence, frame_index)
+
+    loaded = load_sequence_cache(cache_dir, source_file)
+
+    assert loaded is not None
+    cached_sequence, cached_index = loaded
+    assert cached_sequence.sequence_name == "sequence_1"
+    assert cached_sequence.radar_data.dtype.names == RADAR_DTYPE.names
+    for name in RADAR_DTYPE.names:
+        np.testing.assert_array_equal(cached_sequence.radar_data[name], sequence.radar_data[name])
+    np.testing.assert_array_equal(cached_sequence.radar_data[2:5]["range_sc"], sequence.radar_data[2:5]["range_sc"])
+    np.testing.assert_array_equal(cached_sequence.odometry_data, sequence.odometry_data)
+    for attr in ["timestamps", "starts", "ends", "odometry_indices", "sensor_ids"]:
+        np.testing.assert_array_equal(getattr(cached_index, attr), getattr(frame_index, attr))
+    assert not os.path.exists(cache_dir + ".tmp")
+
+
+def test_missing_cache(tmp_path, source_file):
+    assert load_sequence_cache(str(tmp_path / "cache"), source_file) is None
+
+
+@pytest.mark.parametrize("changed_file", ["radar_data.h5", "scenes.json"])
+def test_changed_source_invalidates_cache(tmp_path, source_file, changed_file):
+    sequence, frame_index = make_sequence()
+    cache_dir = str(tmp_path / "cache")
+    write_sequence_cache(cache_dir, source_file, sequence, frame_index)
+
+    path = os.path.join(os.path.dirname(source_file), changed_file)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert load_sequence_cache(cache_dir, source_file) is None
+
+    write_sequence_cache(cache_dir, source_file, sequence, frame_index)
+    with open(path, "ab") as f:
+        f.write(b" ")
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert load_sequence_cache(cache_dir, source_file) is None
+
+
+def test_other_cache_version_is_ignored(tmp_path, source_file):
+    sequence, frame_index = make_sequence()
+    cache_dir = str(tmp_path / "cache")
+    write_sequence_cache(cache_dir, source_file, sequence, frame_index)
+    meta_file = os.path.join(cache_dir, "meta.json")
+    with open(meta_file, "r") as f:
+        meta = json.load(f)
+    meta["version"] -= 1
+    with open(meta_file, "w") as f:
+        json.dump(meta, f)
+
+    assert load_sequence_cache(cache_dir, source_file) is None
+
+
+def test_cache_dir_is_keyed_by_source_path(tmp_path, source_file):
+    cache_root = str(tmp_path / "user_cache")
+    other_dir = tmp_path / "other_dataset" / "sequence_1"
+    other_dir.mkdir(parents=True)
+    other_file = str(other_dir / "radar_data.h5")
+
+    cache_dir = sequence_cache_dir(cache_root, source_file)
+
+    assert os.path.dirname(cache_dir) == cache_root
+    assert os.path.basename(cache_dir).startswith("sequence_1_")
+    assert sequence_cache_dir(cache_root, source_file) == cache_dir
+    assert sequence_cache_dir(cache_root, other_file) != cache_dir
+    assert os.path.dirname(sequence_cache_dir("cache", source_file)) == \
+        os.path.join(os.path.dirname(os.path.realpath(source_file)), "cache")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares frames accumulated sweep by sweep with frames sliced out of the preprocessed columns of a sequence
+"""
+
+import numpy as np
+
+from vispy_radar_scenes.data import FrameIndex, SequenceData
+from vispy_radar_scenes.processing import SweepAccumulator, build_frame, build_frame_from_columns, \
+    sequence_radar_columns
+
+RADAR_DTYPE = np.dtype([("timestamp", np.uint64), ("sensor_id", np.uint8), ("range_sc", np.float32),
+                        ("azimuth_sc", np.float32), ("rcs", np.float32), ("vr_compensated", np.float32),
+                        ("x_cc", np.float32), ("y_cc", np.float32), ("x_seq", np.float32), ("y_seq", np.float32)])
+ODOMETRY_DTYPE = np.dtype([("timestamp", np.uint64), ("x_seq", np.float32), ("y_seq", np.float32),
+                           ("yaw_seq", np.float32)])
+MAX_LOOKBACK = 6
+
+
+def make_sequence(n_frames: int = 30):
+    rng = np.random.default_rng(0)
+    counts = rng.integers(5, 40, n_frames)
+    radar_data = np.zeros(counts.sum(), RADAR_DTYPE)
+    radar_data["timestamp"] = np.repeat(1000 + np.arange(n_frames, dtype=np.uint64) * 17, counts)
+    # Sensor 4 drops out in the middle of the sequence, so some windows miss a sensor
+    sensor_ids = np.arange(n_frames) % 4 + 1
+    sensor_ids[12:20][sensor_ids[12:20] == 4] = 3
+    radar_data["sensor_id"] = np.repeat(sensor_ids, counts)
+    radar_data["range_sc"] = rng.uniform(1, 90, len(radar_data))
+    radar_data["azimuth_sc"] = rng.uniform(-1.2, 1.2, len(radar_data))
+    radar_data["rcs"] = rng.uniform(-20, 20, len(radar_data))
+    radar_data["vr_compensated"] = rng.uniform(-15, 15, len(radar_data))
+
+    odometry_data = np.zeros(n_frames // 2 + 1, ODOMETRY_DTYPE)
+    odometry_data["timestamp"] = 1000 + np.arange(len(odometry_data), dtype=np.uint64) * 34
+    odometry_data["x_seq"] = np.arange(len(odometry_data)) * 0.5
+    odometry_data["yaw_seq"] = np.arange(len(odometry_data)) * 0.05
+
+    frame_index = FrameIndex.from_radar_data(radar_data["timestamp"], radar_data["sensor_id"],
+                                             odometry_data["timestamp"])
+    return SequenceData("sequence_1", radar_data, odometry_data), frame_index
+
+
+def test_accumulated_frames_match_preprocessed_columns():
+    sequence, frame_index = make_sequence()
+    columns = sequence_radar_columns(sequence, frame_index)
+    accumulator = SweepAccumulator(capacity=64)
+    # Forward playback, backward steps and jumps exercise removal, compaction and growth of the buffer
+    frame_order = list(range(len(frame_index))) + [25, 24, 3, 29, 0, 14, 15, 16, 8]
+
+    for frame_idx in frame_order:
+        frame = build_frame(sequence, frame_index, frame_idx, MAX_LOOKBACK, accumulator)
+        expected = build_frame_from_columns(columns, frame_index, frame_idx, MAX_LOOKBACK)
+        for name, column in expected.items():
+            np.testing.assert_allclose(frame[name], column, rtol=1e-6, atol=1e-4, err_msg=f"{name} @ {frame_idx}")
+
+
+def test_frame_holds_latest_sweep_of_every_sensor():
+    sequence, frame_index = make_sequence()
+    frame = build_frame(sequence, frame_index, 17, MAX_LOOKBACK, SweepAccumulator())
+
+    sweeps = frame_index.sweep_window(17, MAX_LOOKBACK)
+    assert sweeps[-1] == 17
+    assert sorted(np.unique(frame["sensor_id"])) == sorted(frame_index.sensor_ids[sweeps])
+    assert len(frame["timestamp"]) == sum(frame_index.ends[sweeps] - frame_index.starts[sweeps])
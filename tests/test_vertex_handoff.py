@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of the double-buffered VertexHandoff between the processing thread and the GUI thread
+"""
+
+import numpy as np
+
+from vispy_radar_scenes.gl_objects import GLRadarDetections, GLRadarDopplerLines
+from vispy_radar_scenes.processing import FrameVertices, Stage, VertexHandoff
+
+
+def make_vertices(value: float, n: int = 5, vertices_per_arrow: int = 2) -> FrameVertices:
+    detections = np.zeros(n, GLRadarDetections.vertex_dtype)
+    detections['a_position'][:, 0] = value
+    lines = np.zeros(vertices_per_arrow * n, GLRadarDopplerLines.vertex_dtype)
+    lines['a_position'][:, 0] = value
+    return FrameVertices(detections, lines, value)
+
+
+def make_handoff() -> VertexHandoff:
+    return VertexHandoff(GLRadarDetections.vertex_dtype, GLRadarDopplerLines.vertex_dtype, initial_size=4)
+
+
+def test_take_returns_copy_of_latest_frame():
+    handoff = make_handoff()
+    vertices = make_vertices(1.0)
+    handoff.write(vertices, 1, Stage.ALL)
+    vertices.detections['a_position'][:] = -1
+
+    slot = handoff.take()
+    assert slot.frame_idx == 1
+    assert slot.stages == Stage.ALL
+    assert np.all(slot.vertices.detections['a_position'][:, 0] == 1.0)
+    assert np.all(slot.vertices.lines['a_position'][:, 0] == 1.0)
+    assert slot.vertices.window_size == 1.0
+    handoff.release()
+    assert handoff.take() is None
+
+
+def test_unread_frame_is_replaced_and_stages_are_merged():
+    handoff = make_handoff()
+    handoff.write(make_vertices(1.0), 1, Stage.ALL)
+    handoff.write(make_vertices(2.0, n=3), 2, Stage.ARROWS)
+
+    slot = handoff.take()
+    assert slot.frame_idx == 2
+    assert slot.stages == Stage.ALL
+    assert len(slot.vertices.detections) == 3
+    assert np.all(slot.vertices.detections['a_position'][:, 0] == 2.0)
+    assert handoff.dropped_frames == 1
+    handoff.release()
+
+
+def test_overwrite_before_take_keeps_the_slot_held_by_the_consumer():
+    handoff = make_handoff()
+    handoff.write(make_vertices(1.0), 1, Stage.ALL)
+    held = handoff.take()
+
+    # Only one slot is free while the consumer holds the other, the second frame overwrites the first one
+    handoff.write(make_vertices(2.0), 2, Stage.COLOR)
+    handoff.write(make_vertices(3.0, n=20), 3, Stage.ARROWS)
+    assert held.frame_idx == 1
+    assert np.all(held.vertices.detections['a_position'][:, 0] == 1.0)
+    assert handoff.dropped_frames == 1
+    handoff.release()
+
+    slot = handoff.take()
+    assert slot is not held
+    assert slot.frame_idx == 3
+    assert slot.stages == Stage.COLOR | Stage.ARROWS
+    assert len(slot.vertices.detections) == 20
+    assert np.all(slot.vertices.detections['a_position'][:, 0] == 3.0)
+    assert np.all(slot.vertices.lines['a_position'][:, 0] == 3.0)
+    handoff.release()
+
+    # Taking a frame resets the merged stages
+    handoff.write(make_vertices(4.0), 4, Stage.ARROWS)
+    assert handoff.take().stages == Stage.ARROWS
+    handoff.release()
+
+
+def test_clear_drops_published_frame():
+    handoff = make_handoff()
+    handoff.write(make_vertices(1.0), 1, Stage.ALL)
+    handoff.clear()
+    assert handoff.take() is None
+
+    handoff.write(make_vertices(2.0), 2, Stage.ARROWS)
+    assert handoff.take().stages == Stage.ARROWS
+    handoff.release()